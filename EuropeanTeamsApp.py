@@ -1,17 +1,23 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import matplotlib
 import plotly.express as px
-import os
+
+import elo
+import head_to_head
+import pipeline
+import players
+import render_cache
+import similarity
+import summaries
+import views
+from data_loader import load_table, snapshot_path
+from schemas import PLAYER_RATINGS
+from standings import table_at_stage
 
 
 matplotlib.use('Agg')  # Use the 'Agg' backend for saving figures
 import warnings
 warnings.filterwarnings('ignore')
-st.set_option('deprecation.showPyplotGlobalUse', False)
 
 
 # Configure Streamlit
@@ -19,28 +25,16 @@ st.set_page_config(page_title="European Football Analysis", page_icon="⚽")
 
 #layout="wide"
 # Load the data
-# Get the current directory path
-current_dir = os.getcwd()
-
-# Creating a list containing all dataset names
-list_of_names = ['Country', 'League', 'Player', 'Team', 'Team_Attributes', 'Player_Attributes', 'Match']
-
-# Create an empty list for datasets
-dataframe_list = []
-# Appending datasets into the list
-for name in list_of_names:
-    file_path = os.path.join(current_dir, name + '.csv')
-    df = pd.read_csv(file_path)
-    dataframe_list.append(df)
-
-#calling each of the datasets 
-countries=dataframe_list[0]
-league=dataframe_list[1]
-players=dataframe_list[2]
-teams=dataframe_list[3]
-team_attributes=dataframe_list[4]
-player_attributes=dataframe_list[5]
-matches=dataframe_list[6]
+# The CSVs are parsed once per server process and reused across reruns until a file changes.
+# Only the small tables are loaded up front, everything else is loaded by the section that needs it.
+teams = load_table('Team')
+league = load_table('League')
+countries = load_table('Country')
+
+# Rendered charts are cached per data version and theme, so repeated views are served as images.
+# Charts rendered ahead of time by precompute.py are picked up from the shared render directory.
+render_cache.use_disk(snapshot_path(render_cache.RENDER_DIR))
+theme = st.get_option('theme.base')
 
 # Main page title and description
 st.title("Football Analytics Explorer - European Football Analysis (2008-2016)")
@@ -51,31 +45,54 @@ st.write(
               and match outcomes with Football Analytics Explorer."
 )
 
+# League, country and season filters. Tables are stored grouped by league and season, so a
+# filtered view only reads the rows of the selected leagues and seasons.
+st.sidebar.header("Filters")
+country_ids = dict(zip(countries['name'], countries['id']))
+selected_countries = st.sidebar.multiselect("Countries", sorted(country_ids))
+league_countries = dict(zip(league['name'], league['country_id']))
+league_choices = sorted(name for name, country_id in league_countries.items()
+                        if not selected_countries or country_id in {country_ids[name] for name in selected_countries})
+selected_leagues = st.sidebar.multiselect("Leagues", league_choices)
+season_choices = sorted({season for _, season in pipeline.get('match_partitions')['offsets']})
+selected_seasons = st.sidebar.multiselect("Seasons", season_choices)
+st.sidebar.caption("Team attributes are filtered by the league the team played in during the season of the snapshot.")
+
+# Picking countries only selects all of their leagues
+filtered_leagues = selected_leagues or (league_choices if selected_countries else None)
+league_name_ids = dict(zip(league['name'], league['id']))
+if filtered_leagues is not None:
+    filtered_leagues = tuple(sorted(int(league_name_ids[name]) for name in filtered_leagues))
+selection = (filtered_leagues, tuple(sorted(selected_seasons)) or None)
+
 # Data Wrangling section
 st.header("Teams Analysis")
 st.write("Let's start by exploring the teams.")
 
-teams_data = pd.merge(team_attributes, teams, on='team_api_id', how='inner')
-
-#lets convert the date columnd to the correct data type 
-teams_data['date'] = pd.to_datetime(teams_data['date'])
+# Team attributes joined with team names, the date column is parsed on load
+teams_data = pipeline.get('teams_data')
+selected_teams = views.selected_teams(selection)
 
 # Show first rows of the data
 if st.checkbox("Show Teams Data"):
     # Join team_attributes with teams on team_api_id
-    st.dataframe(teams_data.head())
+    st.dataframe(selected_teams.head())
 
 # Number of players in the dataset
 if st.checkbox('Show Number of Teams'):
-    num_teams = teams_data['team_api_id'].nunique()
+    num_teams = selected_teams['team_api_id'].nunique()
     st.write(f"Number of teams in the dataset: {num_teams}")
 
 
 # Descriptive statistics
 st.write("Descriptive Statistics of Teams Attributes.")
 if st.checkbox("Show Descriptive Statistics"):
-    st.write(teams_data[['defenceAggression', 'defenceTeamWidth', 'defencePressure',  'buildUpPlayPassing','chanceCreationCrossing',
-                        'chanceCreationShooting',  'chanceCreationPassing', 'buildUpPlaySpeed']].describe())
+    # Served from summary statistics kept per league and season instead of a scan of the rows
+    team_statistics = views.team_statistics(selection)
+    if team_statistics is None:
+        st.info("No team attributes for the selected leagues and seasons.")
+    else:
+        st.write(summaries.describe(team_statistics))
 
 
 # Select the variables we want to plot
@@ -93,12 +110,8 @@ selected_variable = st.selectbox("Select a team numerical attribute to show dist
 if selected_variable:
     # Display histogram
     st.subheader(f"Histogram of {selected_variable}")
-    plt.figure(figsize=(10, 6))
-    plt.hist(teams_data[selected_variable], bins=20, alpha=0.7, edgecolor='black', color='dodgerblue')
-    plt.xlabel("Values")
-    plt.ylabel("Frequency")
-    plt.title(f"Histogram of {selected_variable}")
-    st.pyplot()
+    image = views.chart_image('histogram', selected_variable, theme=theme, selection=selection)
+    st.image(image, use_column_width=True)
 
 
 # List of categorical variables
@@ -119,14 +132,8 @@ selected_variable = st.selectbox("Select a variable to plot", categorical_variab
 if selected_variable:
     # Create a bar chart
     st.subheader(f"Bar Chart for {selected_variable}")
-    variable_counts = teams_data[selected_variable].value_counts(normalize = True)*100
-    plt.figure(figsize=(10, 6))
-    plt.bar(variable_counts.index, variable_counts.values, color='dodgerblue')
-    plt.xlabel(selected_variable)
-    plt.ylabel("Frequency")
-    plt.title(f"Bar Chart for {selected_variable}")
-    plt.xticks(rotation=45)
-    st.pyplot()
+    image = views.chart_image('category_bar_chart', selected_variable, theme=theme, selection=selection)
+    st.image(image, use_column_width=True)
 
 
 # Create a Streamlit app
@@ -141,10 +148,8 @@ if show_heatmap:
     st.write("Explore the relationships between numerical team attributes.")
     
     # Create a heatmap of numerical attribute correlations
-    plt.figure(figsize=(16, 14))
-    sns.heatmap(teams_data[variables_to_plot].corr(), cmap='coolwarm', annot=True, fmt='.2f')
-    plt.title("Heatmap Showing Relationship Between Numerical Team Attributes")
-    st.pyplot()
+    image = views.chart_image('correlation_heatmap', theme=theme, selection=selection)
+    st.image(image, use_column_width=True)
 
 
 # Create a Streamlit app
@@ -158,78 +163,44 @@ attribute_options = ['defenceAggression', 'defenceTeamWidth', 'defencePressure',
 selected_attribute = st.selectbox("Select a team attribute", [''] + attribute_options)
 
 if selected_attribute:
-    # Calculate the average of the selected attribute for each player
-    top_teams = teams_data.groupby(['team_long_name']).agg({
-        selected_attribute: 'mean'
-    }).reset_index()
-
-    # Sort the player data by the average of the selected attribute in descending order
-    top_teams = top_teams.sort_values(by=selected_attribute, ascending=False).head(10)
+    # The averages of every attribute for each team are precomputed, only the 10 highest are picked here
+    top_teams = views.top_teams_table(selected_attribute, n=10, selection=selection)
 
     # Display the top 10 players with the highest average score in the selected attribute
     st.subheader(f"Top 10 Teams with Highest {selected_attribute}")
     st.table(top_teams)
 
     # Create a bar chart to visualize the top 10 players
-    fig, ax = plt.subplots(figsize=(10, 6))
-    top_teams.plot(x='team_long_name', y=selected_attribute, kind='bar', ax=ax, color='tomato')
-    plt.xlabel("Team Name")
-    plt.ylabel(selected_attribute)
-    plt.title(f"Top 10 Teams with Highest {selected_attribute}")
-    st.pyplot(fig)
+    image = views.chart_image('top_teams_bar_chart', selected_attribute, theme=theme, selection=selection)
+    st.image(image, use_column_width=True)
 else:
     st.warning("Please select a team attribute to view the top teams based on attribute selected.")
 
 
-# matches data
-st.title('Analysis on Matches')
-
-matches_data = matches[['id', 'country_id', 'league_id',  'season', 'stage', 'date', 'match_api_id', 'home_team_api_id', 'away_team_api_id', 'home_team_goal', 'away_team_goal']]
+# Similar teams
+st.subheader("Teams Playing Most Like a Team")
 
+# Attribute vectors are standardized once and grouped by snapshot date, a query compares
+# one team with the teams of the same snapshot only
+team_vectors = pipeline.get('team_vectors')
+team_ids = dict(zip(teams_data['team_long_name'], teams_data['team_api_id']))
+selected_team = st.selectbox("Select a team", [''] + sorted(team_ids))
 
-#lets convert the date columnd to the correct data type 
-matches_data['date'] = pd.to_datetime(matches_data['date'])
+if selected_team:
+    dates = similarity.snapshot_dates(team_vectors, team_ids[selected_team])
+    selected_date = st.selectbox("Select an attribute snapshot", [date.strftime('%Y-%m-%d') for date in dates],
+                                 index=len(dates) - 1)
+    selected_metric = st.radio("Similarity measure", similarity.METRICS, horizontal=True)
+    k = st.slider("Number of similar teams", 1, 20, 5)
+    similar = similarity.nearest_teams(team_vectors, team_ids[selected_team], selected_date, k, selected_metric)
+    st.table(similar.drop(columns=['team_api_id', 'date']).rename(columns={'team_long_name': 'team'}))
 
-#creating a new column for home and away teams goals difference
-matches_data['HomeTeamGD']=matches_data['home_team_goal']-matches_data['away_team_goal']  
-matches_data['AwayTeamGD']=matches_data['away_team_goal']-matches_data['home_team_goal']
-#creating a column for drwan matches 
-matches_data['Draw']=matches_data['home_team_goal']==matches_data['away_team_goal']
 
+# matches data
+st.title('Analysis on Matches')
 
-#adding a column for teams match status 
-def match_status(initial = 0):
-    if initial > 0:
-        return 'W'
-    elif initial == 0:
-        return 'D'
-    else:
-        return 'L'
-matches_data['HomeResults'] = matches_data['HomeTeamGD'].apply(match_status)
-matches_data['AwayResults'] = matches_data['AwayTeamGD'].apply(match_status)
-
-#calculating points for teams (win=3, draw=1, lose=0)
-def match_status2(initial2 = 'w'):
-    if initial2 =='W':
-        return 3
-    elif initial2 =='D':
-        return 1
-    else:
-        return 0
-matches_data['HTPoints'] = matches_data['HomeResults'].apply(match_status2)
-matches_data['ATPoints'] = matches_data['AwayResults'].apply(match_status2)
-
-#counting the number of wins for each team
-def check_wins(wins='W'):
-    
-    if wins=='W':
-        
-        return 1
-    else:
-        return 0
-    
-matches_data['HomeWin'] = matches_data['HomeResults'].apply(check_wins)
-matches_data['AwayWin'] = matches_data['AwayResults'].apply(check_wins)
+# Match columns we use with the goal difference, result (W/D/L), points and win columns for home and away teams
+matches_data = views.selected_matches(selection)
 
 
 # Show first rows of the data
@@ -246,23 +217,11 @@ if st.checkbox('Show Number of Matches in the Dataset'):
 # Descriptive statistics
 st.write("Descriptive Statistics of Matchres.")
 if st.checkbox("Show Descriptive Statistics of Matches"):
-    st.write(matches_data.describe())
-
-
-
-# Join matches data with home team information to get match results for each team
-matches_home = teams_data.merge(matches_data, left_on='team_api_id', right_on='home_team_api_id', how='inner')
-
-# Join matches data with home team information to get match results for each team
-matches_away = teams_data.merge(matches_data, left_on='team_api_id', right_on='away_team_api_id', how='inner')
-
-# Concatenate home and away matches data into one dataframe
-all_matches = pd.concat([matches_home, matches_away], ignore_index=True)
-
-# Group the data by 'team ap id' and remove duplicates in the 'date' column for each team
-all_matches = all_matches.groupby('team_api_id').apply(lambda group: group.drop_duplicates(subset=['date_y'])).reset_index(drop=True)
-
-matches_home = teams_data.merge(matches_data, left_on='team_api_id', right_on='home_team_api_id', how='inner')
+    match_statistics = views.match_statistics(selection)
+    if match_statistics is None:
+        st.info("No matches for the selected leagues and seasons.")
+    else:
+        st.write(summaries.describe(match_statistics))
 
 
 
@@ -284,18 +243,14 @@ selected_variable = st.selectbox("Select a Variable:", independent_vars)
 
 # Plot the heatmap when a variable is selected
 if selected_variable:
-    plt.figure(figsize=(8, 8))
-    crosstab = pd.crosstab(matches_home[selected_variable], matches_home['HomeResults'], normalize=True) * 100
-    sns.heatmap(crosstab, annot=True, fmt=".2f", cmap="YlGnBu")
-    plt.title(f'{selected_variable} vs. HomeResults')
-    plt.xlabel('HomeResults')
-    plt.ylabel(selected_variable)
+    # Result counts are precomputed for every variable, only the percentages are worked out on a miss
+    image = views.chart_image('home_results_heatmap', selected_variable, theme=theme, selection=selection)
 
     # Add text about the values in the heatmap
     st.write(f"The values in the heatmap represent the percentage distribution of match outcomes (Win, Draw, Loss) based on the selected variable and Home Results.")
 
     # Show the plot in Streamlit
-    st.pyplot(plt)
+    st.image(image, use_column_width=True)
 
 
 
@@ -311,15 +266,101 @@ away_selected_variable = st.selectbox("Select Variable:", away_independent_vars)
 
 # Plot the heatmap when a variable is selected
 if away_selected_variable:
-    plt.figure(figsize=(8, 8))
-    crosstab = pd.crosstab(matches_away[away_selected_variable], matches_away['AwayResults'], normalize=True) * 100
-    sns.heatmap(crosstab, annot=True, cmap="YlGnBu")
-    plt.title(f'{away_selected_variable} vs. AwayResults')
-    plt.xlabel('Away Results')
-    plt.ylabel(away_selected_variable)
+    # Result counts are precomputed for every variable, only the percentages are worked out on a miss
+    image = views.chart_image('away_results_heatmap', away_selected_variable, theme=theme, selection=selection)
 
     # Show the plot in Streamlit
-    st.pyplot(plt)
+    st.image(image, use_column_width=True)
+
+
+# League tables
+st.subheader("League Table by Matchday")
+
+# Tables after every matchday are precomputed for all leagues and seasons
+standings_index = pipeline.get('standings_index')
+league_ids = {name: int(league_id) for league_id, name in zip(league['id'], league['name'])}
+league_options = sorted(name for name, league_id in league_ids.items()
+                        if any(key[0] == league_id for key in standings_index))
+
+selected_league = league_ids.get(st.selectbox("Select a league", league_options))
+seasons = sorted(season for league_id, season in standings_index if league_id == selected_league)
+selected_season = st.selectbox("Select a season", seasons)
+
+if selected_season:
+    stages = standings_index[(selected_league, selected_season)]
+    selected_stage = st.slider("Matchday", min(stages), max(stages), max(stages))
+    league_table = table_at_stage(pipeline.get('standings'), standings_index, selected_league, selected_season,
+                                  selected_stage)
+    team_names = teams.set_index('team_api_id')['team_long_name']
+    league_table = league_table.assign(team=league_table['team_api_id'].map(team_names))
+    st.dataframe(league_table[['rank', 'team', 'played', 'wins', 'draws', 'losses', 'goals_for', 'goals_against',
+                               'goal_difference', 'points']], hide_index=True)
+
+
+# Elo ratings
+st.subheader("Team Strength Over Time (Elo Ratings)")
+
+# Ratings before and after every match are computed once for the whole history
+elo_ratings = pipeline.get('elo')
+elo_league = league_ids.get(st.selectbox("Select a league for the ratings", league_options))
+league_matches = elo_ratings['ratings'][elo_ratings['ratings']['league_id'].to_numpy() == elo_league]
+league_team_ids = set(league_matches['home_team_api_id']) | set(league_matches['away_team_api_id'])
+strongest = [team_api_id for team_api_id in elo.current_ratings(elo_ratings).index if team_api_id in league_team_ids]
+team_names = teams.set_index('team_api_id')['team_long_name']
+elo_teams = st.multiselect("Select teams", [team_names[team_api_id] for team_api_id in strongest],
+                           default=[team_names[team_api_id] for team_api_id in strongest[:5]])
+if elo_teams:
+    name_ids = {team_names[team_api_id]: team_api_id for team_api_id in strongest}
+    history = elo.rating_history(elo_ratings, [name_ids[name] for name in elo_teams])
+    st.line_chart(history.rename(columns=team_names))
+
+
+# Head to head
+st.subheader("Head to Head")
+
+# Matches are indexed by team pair, a lookup does not scan the match table
+all_team_ids = dict(zip(teams['team_long_name'], teams['team_api_id']))
+h2h_columns = st.columns(2)
+first_team = h2h_columns[0].selectbox("First team", [''] + sorted(all_team_ids))
+second_team = h2h_columns[1].selectbox("Second team", [''] + sorted(all_team_ids))
+
+if first_team and second_team and first_team != second_team:
+    meetings, totals = head_to_head.head_to_head(pipeline.get('head_to_head_index'), all_team_ids[first_team],
+                                                 all_team_ids[second_team])
+    if totals['played']:
+        metrics = st.columns(4)
+        metrics[0].metric("Played", totals['played'])
+        metrics[1].metric(f"{first_team} wins", totals['wins'])
+        metrics[2].metric("Draws", totals['draws'])
+        metrics[3].metric(f"{second_team} wins", totals['losses'])
+        st.write(f"Goals: {first_team} {totals['goals_for']} - {totals['goals_against']} {second_team}")
+        st.dataframe(meetings.iloc[::-1].assign(home_team=meetings['home_team_api_id'].map(team_names),
+                                                away_team=meetings['away_team_api_id'].map(team_names))
+                     [['date', 'season', 'home_team', 'home_team_goal', 'away_team_goal', 'away_team']],
+                     hide_index=True)
+    else:
+        st.info(f"{first_team} and {second_team} never played each other.")
+
+
+# Player analysis
+st.title('Analysis on Players')
+
+# The player tables are only loaded once this section is opened
+if st.checkbox("Show Player Analysis"):
+    player_store = pipeline.get('player_store')
+    players_data = load_table('Player')
+
+    selected_rating = st.selectbox("Select a player attribute", PLAYER_RATINGS)
+    top_players = players.top_players(player_store, players_data, selected_rating, n=10)
+    st.subheader(f"Top 10 Players with Highest {selected_rating}")
+    st.table(top_players[['player_name', selected_rating]])
+
+    # Rating history of one of the top players
+    selected_player = st.selectbox("Select a player to show rating history", top_players['player_name'])
+    if selected_player:
+        player_api_id = top_players.loc[top_players['player_name'] == selected_player, 'player_api_id'].iloc[0]
+        history = players.player_history(player_store, player_api_id)
+        st.line_chart(history.set_index('date')[selected_rating])
 
 
 # Display your name in the sidebar
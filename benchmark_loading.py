@@ -0,0 +1,50 @@
+import argparse
+import multiprocessing
+import resource
+import time
+
+import pandas as pd
+
+from data_loader import parse_csv, table_path
+
+
+# Compares wall time and peak resident memory of the ways Match.csv can be loaded. Every mode
+# runs in a fresh process so peak RSS is not polluted by the previous one; the peak is
+# reported above the RSS of the process before loading.
+#
+#     python benchmark_loading.py [--data-dir DIR] [--chunk-rows N]
+
+def _peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _load(mode, data_dir, chunk_rows):
+    baseline_mb = _peak_rss_mb()
+    start = time.perf_counter()
+    if mode == 'all columns':
+        df = pd.read_csv(table_path('Match', data_dir))
+    elif mode == 'pruned':
+        df = parse_csv('Match', data_dir, chunksize=0)
+    else:
+        df = parse_csv('Match', data_dir, chunksize=chunk_rows)
+    elapsed = time.perf_counter() - start
+    return elapsed, _peak_rss_mb() - baseline_mb, df.memory_usage(deep=True).sum() / 2 ** 20, df.shape
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark loading Match.csv.')
+    parser.add_argument('--data-dir', default=None, help='directory holding the CSVs (default: current directory)')
+    parser.add_argument('--chunk-rows', type=int, default=5000, help='rows per chunk for the streaming loader')
+    args = parser.parse_args(argv)
+
+    context = multiprocessing.get_context('spawn')
+    print(f"{'mode':<12} {'seconds':>8} {'peak MB':>8} {'frame MB':>9}  shape")
+    for mode in ['all columns', 'pruned', 'chunked']:
+        with context.Pool(1) as pool:
+            elapsed, peak_mb, frame_mb, shape = pool.apply(_load, (mode, args.data_dir, args.chunk_rows))
+        print(f"{mode:<12} {elapsed:>8.2f} {peak_mb:>8.1f} {frame_mb:>9.1f}  {shape}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import seaborn as sns
+from matplotlib.figure import Figure
+
+
+# Chart builders used by the app. Each one returns a standalone matplotlib Figure instead of
+# drawing through the pyplot global state, so figures can be rendered from any thread or
+# process and encoded once into the render cache.
+
+# Bump when a chart changes how it is drawn so images rendered by older code are redrawn
+CHARTS_FORMAT = 1
+
+
+def histogram(teams_data, variable):
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.hist(teams_data[variable], bins=20, alpha=0.7, edgecolor='black', color='dodgerblue')
+    ax.set_xlabel("Values")
+    ax.set_ylabel("Frequency")
+    ax.set_title(f"Histogram of {variable}")
+    return fig
+
+
+def category_bar_chart(teams_data, variable):
+    variable_counts = teams_data[variable].value_counts(normalize=True) * 100
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.bar(variable_counts.index.astype(str), variable_counts.values, color='dodgerblue')
+    ax.set_xlabel(variable)
+    ax.set_ylabel("Frequency")
+    ax.set_title(f"Bar Chart for {variable}")
+    ax.tick_params(axis='x', labelrotation=45)
+    return fig
+
+
+def correlation_heatmap(correlations):
+    fig = Figure(figsize=(16, 14))
+    ax = fig.subplots()
+    sns.heatmap(correlations, cmap='coolwarm', annot=True, fmt='.2f', ax=ax)
+    ax.set_title("Heatmap Showing Relationship Between Numerical Team Attributes")
+    return fig
+
+
+def top_teams_bar_chart(top_teams, attribute):
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    top_teams.plot(x='team_long_name', y=attribute, kind='bar', ax=ax, color='tomato')
+    ax.set_xlabel("Team Name")
+    ax.set_ylabel(attribute)
+    ax.set_title(f"Top 10 Teams with Highest {attribute}")
+    return fig
+
+
+def results_heatmap(crosstab, variable, results_label, fmt='.2f'):
+    fig = Figure(figsize=(8, 8))
+    ax = fig.subplots()
+    sns.heatmap(crosstab, annot=True, fmt=fmt, cmap="YlGnBu", ax=ax)
+    ax.set_title(f'{variable} vs. {crosstab.columns.name}')
+    ax.set_xlabel(results_label)
+    ax.set_ylabel(variable)
+    return fig
+
+
+def no_data(title):
+    # Placeholder for a chart whose filtered data is empty
+    fig = Figure(figsize=(10, 2))
+    ax = fig.subplots()
+    ax.text(0.5, 0.5, "No data for the selected leagues and seasons", ha='center', va='center')
+    ax.set_title(title)
+    ax.set_axis_off()
+    return fig
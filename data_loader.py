@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import threading
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from schemas import COLUMN_TABLES, TABLE_NAMES, TABLE_SCHEMAS, read_csv_kwargs
+
+
+# Compiled snapshots live next to the CSVs, see snapshot.py
+SNAPSHOT_DIR = 'snapshot'
+MANIFEST_NAME = 'manifest.json'
+
+# Tables streamed from their CSV in chunks of this many rows, so peak memory while parsing
+# is bounded by one chunk plus the compact frame built so far
+CHUNK_ROWS = {'Match': 5000, 'Match_Lineups': 5000, 'Match_Odds': 5000, 'Player_Attributes': 20000}
+
+# Process-wide cache of parsed tables. Streamlit re-executes the app script on every
+# widget interaction but keeps imported modules alive, so anything stored here
+# survives reruns and is shared by every session served by the same process.
+_table_cache = {}
+_table_locks = {}
+_cache_lock = threading.Lock()
+
+
+def table_path(name, data_dir=None):
+    # The app has always read the CSVs from the working directory. Column tables (see
+    # schemas.COLUMN_TABLES) are read from the CSV they are part of.
+    return os.path.join(data_dir or os.getcwd(), COLUMN_TABLES.get(name, name) + '.csv')
+
+
+def snapshot_path(filename, data_dir=None):
+    return os.path.join(data_dir or os.getcwd(), SNAPSHOT_DIR, filename)
+
+
+def file_signature(path):
+    # A file is considered unchanged while its size and modification time are the same
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+def data_version(data_dir=None):
+    # Version string covering every table, used to key caches of derived results
+    signatures = [file_signature(table_path(name, data_dir))[1:] for name in TABLE_NAMES]
+    return '-'.join(f'{mtime:x}.{size:x}' for mtime, size in signatures)
+
+
+def schema_fingerprint(name):
+    # Changes whenever the columns or dtypes declared for a table change
+    return repr(sorted((key, repr(value)) for key, value in TABLE_SCHEMAS[name].items()))
+
+
+def schema_version():
+    # Digest of every table schema, keying results derived from the tables alongside data_version()
+    fingerprints = '\n'.join(f'{name}: {schema_fingerprint(name)}' for name in sorted(TABLE_SCHEMAS))
+    return hashlib.sha1(fingerprints.encode()).hexdigest()[:12]
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_manifest(data_dir=None):
+    try:
+        with open(snapshot_path(MANIFEST_NAME, data_dir)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'tables': {}}
+
+
+def snapshot_is_fresh(name, data_dir=None, manifest=None):
+    # A snapshot is fresh when it was compiled from the current CSV with the current schema.
+    # Size and mtime are checked first; the CSV is only hashed when its mtime moved (e.g.
+    # after a fresh checkout) but its size did not.
+    entry = (manifest or read_manifest(data_dir))['tables'].get(name)
+    if entry is None or entry.get('schema') != schema_fingerprint(name):
+        return False
+    if not os.path.exists(snapshot_path(entry['file'], data_dir)):
+        return False
+    _, mtime_ns, size = file_signature(table_path(name, data_dir))
+    if size != entry['size']:
+        return False
+    return mtime_ns == entry['mtime_ns'] or file_sha256(table_path(name, data_dir)) == entry['sha256']
+
+
+def read_snapshot(name, data_dir=None, manifest=None):
+    import pyarrow as pa
+
+    entry = (manifest or read_manifest(data_dir))['tables'][name]
+    # Memory-mapping lets worker processes share the pages of the snapshot; split_blocks
+    # keeps numeric columns without nulls as zero-copy views of the mapped buffers
+    with pa.memory_map(snapshot_path(entry['file'], data_dir)) as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+def iter_csv(name, data_dir=None, chunksize=None):
+    # Yields the table in chunks, each already pruned to the schema columns and dtypes
+    chunksize = chunksize or CHUNK_ROWS.get(name, 10000)
+    with pd.read_csv(table_path(name, data_dir), chunksize=chunksize, **read_csv_kwargs(name)) as reader:
+        yield from reader
+
+
+def concat_chunks(chunks):
+    # Concatenates compact chunks, merging the categories each chunk found on its own so
+    # categorical columns stay categorical
+    chunks = list(chunks)
+    if not chunks:
+        return pd.DataFrame()
+    df = pd.concat(chunks, ignore_index=True)
+    for column in chunks[0].columns:
+        if isinstance(chunks[0][column].dtype, pd.CategoricalDtype):
+            df[column] = union_categoricals([chunk[column] for chunk in chunks], sort_categories=True)
+    return df
+
+
+def parse_csv(name, data_dir=None, chunksize=None):
+    # Only the columns declared in the schema are parsed, straight into compact dtypes.
+    # Large tables are streamed in chunks unless chunksize is 0.
+    chunksize = CHUNK_ROWS.get(name) if chunksize is None else chunksize
+    if not chunksize:
+        return pd.read_csv(table_path(name, data_dir), **read_csv_kwargs(name))
+    return concat_chunks(iter_csv(name, data_dir, chunksize))
+
+
+def _read_table(name, data_dir=None):
+    # Prefer the compiled snapshot and fall back to the CSV when it is missing or stale
+    try:
+        manifest = read_manifest(data_dir)
+        if snapshot_is_fresh(name, data_dir, manifest):
+            return read_snapshot(name, data_dir, manifest)
+    except ImportError:
+        pass
+    return parse_csv(name, data_dir)
+
+
+def _lock_for(key):
+    with _cache_lock:
+        return _table_locks.setdefault(key, threading.Lock())
+
+
+def load_table(name, data_dir=None):
+    # Returns the cached frame for a table, reading it again only when the file changed.
+    # The frame is shared between sessions, so callers must copy before mutating it.
+    signature = file_signature(table_path(name, data_dir))
+    # Column tables share their CSV with another table, so the key has both
+    key = (name, signature[0])
+
+    # One lock per table so two sessions starting together parse Match.csv only once
+    with _lock_for(key):
+        cached = _table_cache.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        df = _read_table(name, data_dir)
+        _table_cache[key] = (signature, df)
+        return df
+
+
+def store_table(name, df, data_dir=None):
+    # Installs an up to date frame for a table whose CSV was just changed, e.g. after
+    # appending rows to it, so the next load does not parse the whole file again
+    signature = file_signature(table_path(name, data_dir))
+    key = (name, signature[0])
+    with _lock_for(key):
+        _table_cache[key] = (signature, df)
+
+
+def load_tables(names=TABLE_NAMES, data_dir=None):
+    # Mapping of table name to its (cached) dataframe
+    return {name: load_table(name, data_dir) for name in names}
+
+
+def clear_cache():
+    with _cache_lock:
+        _table_cache.clear()
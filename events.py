@@ -0,0 +1,200 @@
+import argparse
+import io
+import os
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from data_loader import SNAPSHOT_DIR, file_sha256, file_signature, read_manifest, snapshot_path, table_path
+from schemas import MATCH_EVENT_COLUMNS
+
+
+# Extracts the XML event blobs of Match.csv (goal, shoton, shotoff, foulcommit, card, cross,
+# corner, possession) into two typed tables, parsed once in a process pool and saved next
+# to the snapshot:
+#   events:     match_api_id, event, minute, added_time, team_api_id, player_api_id, subtype
+#   possession: match_api_id, minute, home_possession, away_possession
+#
+#     python events.py [--data-dir DIR] [--workers N]
+
+# Bump when the extracted tables change shape so saved tables are rebuilt
+EVENTS_FORMAT = 2
+
+# Matches handed to a worker at a time
+MATCHES_PER_TASK = 2000
+
+_events_cache = {}
+_events_lock = threading.Lock()
+
+
+def _int(text):
+    try:
+        return int(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_events(match_api_id, event, xml):
+    # Rows of one XML blob, read with a streaming parser one <value> element at a time.
+    # Only direct children of <value> are read; the nested <stats> block reuses tag names.
+    events, possession = [], []
+    if not isinstance(xml, str) or '<value>' not in xml:
+        return events, possession
+    for _, value in ET.iterparse(io.BytesIO(xml.encode()), events=('end',)):
+        if value.tag != 'value':
+            continue
+        minute = _int(value.findtext('elapsed'))
+        if event == 'possession':
+            possession.append((match_api_id, minute, _int(value.findtext('homepos')),
+                               _int(value.findtext('awaypos'))))
+        else:
+            subtype = value.findtext('subtype') or value.findtext('card_type') or value.findtext('goal_type')
+            events.append((match_api_id, event, minute, _int(value.findtext('elapsed_plus')) or 0,
+                           _int(value.findtext('team')), _int(value.findtext('player1')), subtype))
+        value.clear()
+    return events, possession
+
+
+def _parse_chunk(chunk):
+    # Worker task: all event rows of a block of matches
+    events, possession = [], []
+    for column in MATCH_EVENT_COLUMNS:
+        for match_api_id, xml in zip(chunk['match_api_id'], chunk[column]):
+            chunk_events, chunk_possession = parse_events(int(match_api_id), column, xml)
+            events.extend(chunk_events)
+            possession.extend(chunk_possession)
+    return events, possession
+
+
+def _events_frame(rows):
+    df = pd.DataFrame(rows, columns=['match_api_id', 'event', 'minute', 'added_time', 'team_api_id',
+                                     'player_api_id', 'subtype'])
+    return df.astype({'match_api_id': np.int32, 'event': pd.CategoricalDtype(MATCH_EVENT_COLUMNS),
+                      'minute': 'Int16', 'added_time': np.int8, 'team_api_id': 'Int32',
+                      'player_api_id': 'Int32', 'subtype': 'category'})
+
+
+def _possession_frame(rows):
+    df = pd.DataFrame(rows, columns=['match_api_id', 'minute', 'home_possession', 'away_possession'])
+    return df.astype({'match_api_id': np.int32, 'minute': 'Int16', 'home_possession': 'Int8',
+                      'away_possession': 'Int8'})
+
+
+def extract_events(data_dir=None, workers=None):
+    # Parses every event column of Match.csv, fanning blocks of matches out to a process pool.
+    # Match.csv is an append-only log (see incremental.py): only the last row of a match counts.
+    reader = pd.read_csv(table_path('Match', data_dir), usecols=['match_api_id'] + MATCH_EVENT_COLUMNS,
+                         dtype={column: str for column in MATCH_EVENT_COLUMNS}, chunksize=MATCHES_PER_TASK)
+    results = {}
+    with reader, ProcessPoolExecutor(max_workers=workers) as pool:
+        # Only a few blocks are read ahead of the workers, so the XML of the whole file is
+        # never held in pending tasks at once
+        window = 2 * (workers or os.cpu_count() or 1)
+        pending = {}
+        block_ids = []
+        for position, chunk in enumerate(reader):
+            chunk = chunk.drop_duplicates('match_api_id', keep='last')
+            block_ids.append(chunk['match_api_id'].to_numpy())
+            pending[pool.submit(_parse_chunk, chunk)] = position
+            if len(pending) >= window:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[pending.pop(future)] = future.result()
+        for future in pending:
+            results[pending[future]] = future.result()
+
+    # Matches re-sent in a later block are dropped from the earlier ones
+    superseded = [set() for _ in block_ids]
+    later_ids = set()
+    for position in reversed(range(len(block_ids))):
+        ids = set(block_ids[position].tolist())
+        superseded[position] = ids & later_ids
+        later_ids |= ids
+
+    # Rows stay in file order whatever order the blocks finished in
+    events, possession = [], []
+    for position in sorted(results):
+        chunk_events, chunk_possession = results[position]
+        if superseded[position]:
+            chunk_events = [row for row in chunk_events if row[0] not in superseded[position]]
+            chunk_possession = [row for row in chunk_possession if row[0] not in superseded[position]]
+        events.extend(chunk_events)
+        possession.extend(chunk_possession)
+    return {'events': _events_frame(events), 'possession': _possession_frame(possession)}
+
+
+def _is_fresh(entry, data_dir):
+    if entry is None or entry.get('format') != EVENTS_FORMAT:
+        return False
+    if not all(os.path.exists(snapshot_path(name + '.arrow', data_dir)) for name in ['events', 'possession']):
+        return False
+    source = table_path('Match', data_dir)
+    _, mtime_ns, size = file_signature(source)
+    return size == entry['size'] and (mtime_ns == entry['mtime_ns'] or file_sha256(source) == entry['sha256'])
+
+
+def save_events(tables, data_dir=None):
+    import pyarrow as pa
+
+    from snapshot import write_manifest
+
+    os.makedirs(os.path.join(data_dir or os.getcwd(), SNAPSHOT_DIR), exist_ok=True)
+    for name, df in tables.items():
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        tmp_path = snapshot_path(name + '.arrow.tmp', data_dir)
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, snapshot_path(name + '.arrow', data_dir))
+
+    source = table_path('Match', data_dir)
+    _, mtime_ns, size = file_signature(source)
+    manifest = read_manifest(data_dir)
+    manifest['events'] = {'format': EVENTS_FORMAT, 'sha256': file_sha256(source), 'size': size,
+                          'mtime_ns': mtime_ns, 'rows': {name: len(df) for name, df in tables.items()}}
+    write_manifest(manifest, data_dir)
+
+
+def _read_saved(data_dir=None):
+    import pyarrow as pa
+
+    tables = {}
+    for name in ['events', 'possession']:
+        with pa.memory_map(snapshot_path(name + '.arrow', data_dir)) as source:
+            tables[name] = pa.ipc.open_file(source).read_all().to_pandas(split_blocks=True)
+    return tables
+
+
+def load_events(data_dir=None, workers=None):
+    # The events and possession tables for the current Match.csv: from memory, then from the
+    # snapshot, and only extracted (and saved) again when Match.csv changed
+    signature = file_signature(table_path('Match', data_dir))
+    with _events_lock:
+        cached = _events_cache.get(signature[0])
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        if _is_fresh(read_manifest(data_dir).get('events'), data_dir):
+            tables = _read_saved(data_dir)
+        else:
+            tables = extract_events(data_dir, workers)
+            save_events(tables, data_dir)
+        _events_cache[signature[0]] = (signature, tables)
+        return tables
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Extract the XML match events of Match.csv.')
+    parser.add_argument('--data-dir', default=None, help='directory holding the CSVs (default: current directory)')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per core)')
+    args = parser.parse_args(argv)
+
+    tables = load_events(args.data_dir, args.workers)
+    for name, df in tables.items():
+        print(f"{name}: {len(df)} rows")
+
+
+if __name__ == '__main__':
+    main()
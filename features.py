@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+
+
+# Match results from a team's point of view, in the order the heatmaps have always shown them
+RESULTS = ['D', 'L', 'W']
+
+# Lookup tables indexed by sign(home goals - away goals) + 1, i.e. 0 = home loss, 1 = draw, 2 = home win
+_HOME_RESULT_CODES = np.array([1, 0, 2], dtype=np.int8)
+_AWAY_RESULT_CODES = np.array([2, 0, 1], dtype=np.int8)
+_HOME_POINTS = np.array([0, 1, 3], dtype=np.int8)
+_AWAY_POINTS = np.array([3, 1, 0], dtype=np.int8)
+
+
+def add_match_outcomes(matches_data):
+    # Adds goal differences, results (W/D/L), points (win=3, draw=1, lose=0) and win flags
+    # for both teams in a single vectorized pass over the goal columns
+    home_goals = matches_data['home_team_goal'].to_numpy()
+    away_goals = matches_data['away_team_goal'].to_numpy()
+    goal_difference = home_goals - away_goals
+    outcome = np.sign(goal_difference).astype(np.int8) + 1
+
+    return matches_data.assign(
+        HomeTeamGD=goal_difference,
+        AwayTeamGD=-goal_difference,
+        Draw=outcome == 1,
+        HomeResults=pd.Categorical.from_codes(_HOME_RESULT_CODES[outcome], categories=RESULTS),
+        AwayResults=pd.Categorical.from_codes(_AWAY_RESULT_CODES[outcome], categories=RESULTS),
+        HTPoints=_HOME_POINTS[outcome],
+        ATPoints=_AWAY_POINTS[outcome],
+        HomeWin=(outcome == 2).astype(np.int8),
+        AwayWin=(outcome == 0).astype(np.int8),
+    )
+
+
+def asof_join_team_attributes(teams_data, matches_data, team_column):
+    # Pairs every match with the latest attribute snapshot of the team in team_column taken
+    # on or before kick-off, giving exactly one row per team and match. Matches played before
+    # a team's first snapshot have no attributes to pair with and are left out, as are teams
+    # without any snapshot in the inner join this replaces.
+    # merge_asof needs both sides keyed with the same 64-bit integer type
+    match_keys = pd.DataFrame({'team_api_id': matches_data[team_column].to_numpy(dtype=np.int64),
+                               'date': matches_data['date'].to_numpy(),
+                               'match_row': np.arange(len(matches_data))})
+    snapshot_keys = pd.DataFrame({'team_api_id': teams_data['team_api_id'].to_numpy(dtype=np.int64),
+                                  'date': teams_data['date'].to_numpy(),
+                                  'snapshot_row': np.arange(len(teams_data))})
+
+    # Only the small key frames go through merge_asof, the wide rows are gathered afterwards
+    pairs = pd.merge_asof(match_keys.sort_values('date', kind='stable'),
+                          snapshot_keys.sort_values('date', kind='stable'),
+                          on='date', by='team_api_id', direction='backward')
+    pairs = pairs.dropna(subset=['snapshot_row']).sort_values('match_row')
+
+    # Same column names as a plain merge: the snapshot date becomes date_x, the match date date_y
+    overlap = teams_data.columns.intersection(matches_data.columns)
+    snapshots = teams_data.take(pairs['snapshot_row'].to_numpy(dtype=np.intp))
+    snapshots = snapshots.rename(columns={name: name + '_x' for name in overlap}).reset_index(drop=True)
+    matches = matches_data.take(pairs['match_row'].to_numpy())
+    matches = matches.rename(columns={name: name + '_y' for name in overlap}).reset_index(drop=True)
+    return pd.concat([snapshots, matches], axis=1)
+
+
+def build_team_matches(matches_home, matches_away):
+    # Long table with one row per team and match out of the as-of home and away joins,
+    # ordered by team and then by match date
+    all_matches = pd.concat([matches_home, matches_away], ignore_index=True)
+    return all_matches.sort_values(['team_api_id', 'date_y'], kind='stable', ignore_index=True)
+
+
+def result_counts(joined, variables, result_column):
+    # Counts of match results for every category of each attribute class, i.e. the cells of
+    # pd.crosstab(joined[variable], joined[result_column]) for all variables at once.
+    # Categories or results that never occur are left out, as crosstab does.
+    results = joined[result_column].astype(pd.CategoricalDtype(RESULTS))
+    result_codes = results.cat.codes.to_numpy(dtype=np.int64)
+    counts = {}
+    for variable in variables:
+        values = joined[variable].astype('category')
+        codes = values.cat.codes.to_numpy(dtype=np.int64)
+        valid = (codes >= 0) & (result_codes >= 0)
+        n_categories = len(values.cat.categories)
+        cells = np.bincount(codes[valid] * len(RESULTS) + result_codes[valid],
+                            minlength=n_categories * len(RESULTS)).reshape(n_categories, len(RESULTS))
+        table = pd.DataFrame(cells, index=pd.Index(values.cat.categories, name=variable),
+                             columns=pd.Index(RESULTS, name=result_column))
+        counts[variable] = table.loc[table.sum(axis=1) > 0, table.sum(axis=0) > 0]
+    return counts
+
+
+def normalized_crosstab(counts):
+    # Percentage of all matches falling in each cell, like pd.crosstab(..., normalize=True) * 100
+    return counts / counts.to_numpy().sum() * 100
+
+
+def team_attribute_means(teams_data, attributes):
+    # Mean of each numerical attribute over all snapshots of a team, one row per team name
+    return teams_data.groupby('team_long_name', observed=True)[attributes].mean()
+
+
+def top_positions(values, n=10, largest=True):
+    # Positions of the n highest (or lowest) values, best first, ties in position order and
+    # NaNs always last. argpartition picks the n candidates in linear time so only those n
+    # values get sorted.
+    values = np.asarray(values, dtype=np.float64)
+    keys = np.where(np.isnan(values), np.inf, -values if largest else values)
+    n = min(n, len(keys))
+    if n == 0:
+        return np.array([], dtype=np.intp)
+    candidates = np.argpartition(keys, n - 1)[:n]
+    return candidates[np.argsort(keys[candidates], kind='stable')]
+
+
+def top_teams(means, attribute, n=10, largest=True):
+    # The n teams with the highest (or lowest) mean attribute, best first
+    values = means[attribute].to_numpy(dtype=np.float64)
+    order = top_positions(values, n, largest)
+    if not len(order):
+        return pd.DataFrame({'team_long_name': [], attribute: []})
+    return pd.DataFrame({'team_long_name': means.index[order], attribute: values[order]},
+                        index=order)
+
+
+def team_match_long_table(matches_data):
+    # Two rows per match, one from each team's point of view, with goals for/against, result
+    # and points of that team
+    home = pd.DataFrame({
+        'match_api_id': matches_data['match_api_id'].to_numpy(),
+        'league_id': matches_data['league_id'].to_numpy(),
+        'season': matches_data['season'].to_numpy(),
+        'stage': matches_data['stage'].to_numpy(),
+        'date': matches_data['date'].to_numpy(),
+        'team_api_id': matches_data['home_team_api_id'].to_numpy(),
+        'opponent_api_id': matches_data['away_team_api_id'].to_numpy(),
+        'home': True,
+        'goals_for': matches_data['home_team_goal'].to_numpy(),
+        'goals_against': matches_data['away_team_goal'].to_numpy(),
+        'result': matches_data['HomeResults'].to_numpy(),
+        'points': matches_data['HTPoints'].to_numpy(),
+    })
+    away = home.assign(
+        team_api_id=home['opponent_api_id'].to_numpy(),
+        opponent_api_id=home['team_api_id'].to_numpy(),
+        home=False,
+        goals_for=home['goals_against'].to_numpy(),
+        goals_against=home['goals_for'].to_numpy(),
+        result=matches_data['AwayResults'].to_numpy(),
+        points=matches_data['ATPoints'].to_numpy(),
+    )
+    long_table = pd.concat([home, away], ignore_index=True)
+    long_table['season'] = long_table['season'].astype(matches_data['season'].dtype)
+    long_table['result'] = long_table['result'].astype(pd.CategoricalDtype(RESULTS))
+    return long_table
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+
+# Form of both teams going into every match: points, goals for, goals against and win rate
+# over each team's previous N matches. The team-match long table (see
+# features.team_match_long_table) is sorted by team and date once, and every window sum is
+# the difference of two rows of one cumulative sum, for all windows and teams at once.
+
+FORM_WINDOWS = [5, 10]
+
+
+def form_features(team_matches, windows=FORM_WINDOWS):
+    # One row per match with the form of the home and away teams over each window. Windows
+    # only count matches played before the match, so the first matches of a team cover fewer
+    # matches than the window (see the played columns).
+    order = np.lexsort((team_matches['match_api_id'].to_numpy(), team_matches['date'].to_numpy(),
+                        team_matches['team_api_id'].to_numpy()))
+    rows = team_matches.take(order)
+    team_ids = rows['team_api_id'].to_numpy()
+    values = np.column_stack([rows['points'].to_numpy(), rows['goals_for'].to_numpy(),
+                              rows['goals_against'].to_numpy(),
+                              (rows['result'] == 'W').to_numpy()]).astype(np.int32)
+    totals = np.zeros((len(rows) + 1, values.shape[1]), dtype=np.int32)
+    np.cumsum(values, axis=0, out=totals[1:])
+
+    # Position of every row and of the first match of its team
+    positions = np.arange(len(rows))
+    starts = np.r_[True, team_ids[1:] != team_ids[:-1]] if len(rows) else np.array([], dtype=bool)
+    first = np.maximum.accumulate(np.where(starts, positions, 0))
+
+    form = {'match_api_id': rows['match_api_id'].to_numpy(), 'home': rows['home'].to_numpy()}
+    for window in windows:
+        lower = np.maximum(positions - window, first)
+        sums = totals[positions] - totals[lower]
+        played = positions - lower
+        form[f'points_{window}'] = sums[:, 0].astype(np.int16)
+        form[f'goals_for_{window}'] = sums[:, 1].astype(np.int16)
+        form[f'goals_against_{window}'] = sums[:, 2].astype(np.int16)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            form[f'win_rate_{window}'] = (sums[:, 3] / played).astype(np.float32)
+        form[f'played_{window}'] = played.astype(np.int8)
+    form = pd.DataFrame(form)
+
+    # Home and away side by side, joinable to the match tables on match_api_id
+    home = form[form['home']].drop(columns='home').set_index('match_api_id').add_prefix('home_')
+    away = form[~form['home']].drop(columns='home').set_index('match_api_id').add_prefix('away_')
+    return home.join(away, how='inner').sort_index().reset_index()
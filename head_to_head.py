@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+
+# Head-to-head index: every match is keyed by its unordered team pair, the smaller team id
+# packed above the larger one in an int64. Matches are sorted by pair key then date, and
+# each pair maps to its row offsets and to a row of precomputed totals, so the meetings of
+# two teams are a dict lookup and a slice whatever the size of the history.
+
+H2H_MATCH_COLUMNS = ['match_api_id', 'league_id', 'season', 'stage', 'date', 'home_team_api_id',
+                     'away_team_api_id', 'home_team_goal', 'away_team_goal']
+
+
+def pair_keys(team_a, team_b):
+    team_a = np.asarray(team_a, dtype=np.int64)
+    team_b = np.asarray(team_b, dtype=np.int64)
+    return (np.minimum(team_a, team_b) << 32) | np.maximum(team_a, team_b)
+
+
+def build_head_to_head(matches_data):
+    keys = pair_keys(matches_data['home_team_api_id'], matches_data['away_team_api_id'])
+    order = np.lexsort((matches_data['match_api_id'].to_numpy(), matches_data['date'].to_numpy(), keys))
+    matches = matches_data[H2H_MATCH_COLUMNS].take(order).reset_index(drop=True)
+    keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.array([], dtype=int)
+    stops = np.append(starts[1:], len(keys))
+
+    # Goals and results from the point of view of the smaller team id of each pair
+    home_is_first = (matches['home_team_api_id'].to_numpy(dtype=np.int64) == keys >> 32)
+    home_goals = matches['home_team_goal'].to_numpy(dtype=np.int64)
+    away_goals = matches['away_team_goal'].to_numpy(dtype=np.int64)
+    first_goals = np.where(home_is_first, home_goals, away_goals)
+    second_goals = np.where(home_is_first, away_goals, home_goals)
+    results = np.column_stack([first_goals > second_goals, first_goals == second_goals, first_goals < second_goals,
+                               first_goals, second_goals]).astype(np.int64)
+    totals = np.add.reduceat(results, starts, axis=0) if len(starts) else np.zeros((0, 5), dtype=np.int64)
+    summary = pd.DataFrame({
+        'team_a': keys[starts] >> 32,
+        'team_b': keys[starts] & 0xFFFFFFFF,
+        'played': stops - starts,
+        'team_a_wins': totals[:, 0],
+        'draws': totals[:, 1],
+        'team_b_wins': totals[:, 2],
+        'team_a_goals': totals[:, 3],
+        'team_b_goals': totals[:, 4],
+    })
+    offsets = {int(key): (pair, int(start), int(stop))
+               for pair, (key, start, stop) in enumerate(zip(keys[starts], starts, stops))}
+    return {'matches': matches, 'summary': summary, 'offsets': offsets}
+
+
+def head_to_head(index, team_a, team_b):
+    # The meetings of two teams, oldest first, and their totals from team_a's point of view
+    key = int(pair_keys(team_a, team_b))
+    if key not in index['offsets']:
+        return index['matches'].iloc[0:0], {'played': 0, 'wins': 0, 'draws': 0, 'losses': 0,
+                                            'goals_for': 0, 'goals_against': 0}
+    pair, start, stop = index['offsets'][key]
+    row = index['summary'].iloc[pair]
+    first = team_a == row['team_a']
+    totals = {
+        'played': int(row['played']),
+        'wins': int(row['team_a_wins' if first else 'team_b_wins']),
+        'draws': int(row['draws']),
+        'losses': int(row['team_b_wins' if first else 'team_a_wins']),
+        'goals_for': int(row['team_a_goals' if first else 'team_b_goals']),
+        'goals_against': int(row['team_b_goals' if first else 'team_a_goals']),
+    }
+    return index['matches'].iloc[start:stop], totals
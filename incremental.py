@@ -0,0 +1,214 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import pipeline
+from data_loader import data_version, load_table, store_table, table_path
+from elo import build_elo, can_continue, continue_elo
+from features import (add_match_outcomes, asof_join_team_attributes, result_counts, team_match_long_table)
+from partitions import league_season_keys
+from schemas import COLUMN_TABLES, MATCH_COLUMNS, TEAM_CLASS_ATTRIBUTES, read_csv_kwargs
+from standings import build_standings, index_standings
+from summaries import describe_columns, partition_statistics
+
+
+# Incremental update path: a delta of new or changed matches (keyed by match_api_id) and of
+# new Team_Attributes snapshots is appended to the CSVs, and the derived stages are updated
+# from the delta instead of being rebuilt from the whole history.
+#
+#     python incremental.py --matches new_matches.csv --team-attributes new_snapshots.csv
+#
+# The CSVs act as append-only logs: the teams_data and matches_data stages keep the last
+# row of a snapshot or match, which is what makes appending a changed match an update.
+
+# Stages kept up to date by ingest(); every other stage is rebuilt lazily on next use
+UPDATED_STAGES = ['teams_data', 'matches_data', 'matches_home', 'matches_away', 'home_result_counts',
+                  'away_result_counts', 'team_matches', 'standings', 'standings_index', 'match_statistics', 'elo']
+
+
+def _append(base, rows):
+    # Appends rows to a frame, keeping categorical columns categorical when the new rows
+    # bring categories the base frame has not seen
+    combined = pd.concat([base, rows], ignore_index=True)
+    for column in base.columns:
+        if isinstance(base[column].dtype, pd.CategoricalDtype):
+            categories = base[column].cat.categories
+            new_categories = pd.Index(rows[column].dropna().unique()).difference(categories)
+            combined[column] = combined[column].astype(pd.CategoricalDtype(categories.append(new_categories)))
+    return combined
+
+
+def _append_csv(name, delta_path, data_dir=None):
+    # Appends the raw delta rows to the table's CSV, aligned on its header
+    target = table_path(name, data_dir)
+    header = pd.read_csv(target, nrows=0).columns
+    rows = pd.read_csv(delta_path, dtype=str, keep_default_na=False).reindex(columns=header, fill_value='')
+    with open(target, 'rb+') as f:
+        f.seek(0, 2)
+        if f.tell():
+            f.seek(-1, 2)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+    rows.to_csv(target, mode='a', header=False, index=False)
+
+
+def _column_tables(source):
+    return [name for name, table in COLUMN_TABLES.items() if table == source]
+
+
+def _read_delta(name, delta_path):
+    # Delta rows with the schema of a table. Columns missing from the delta are left empty.
+    kwargs = read_csv_kwargs(name)
+    header = pd.read_csv(delta_path, nrows=0).columns
+    columns = kwargs['usecols']
+    kwargs['usecols'] = [column for column in columns if column in header]
+    missing = {column: kwargs['dtype'][column] for column in columns if column not in header}
+    return pd.read_csv(delta_path, **kwargs).reindex(columns=columns).astype(missing)
+
+
+def _update_counts(counts, removed, added, result_column):
+    # Result counts are additive: take out the rows being replaced and add their new version
+    removed_counts = result_counts(removed, TEAM_CLASS_ATTRIBUTES, result_column)
+    added_counts = result_counts(added, TEAM_CLASS_ATTRIBUTES, result_column)
+    updated = {}
+    for variable in TEAM_CLASS_ATTRIBUTES:
+        table = counts[variable].sub(removed_counts[variable], fill_value=0).add(added_counts[variable], fill_value=0)
+        table = table.fillna(0).astype(np.int64)
+        updated[variable] = table.loc[table.sum(axis=1) > 0, table.sum(axis=0) > 0]
+    return updated
+
+
+def _update_statistics(partitions, frame, columns, keys, changed):
+    # Statistics of the changed partitions are rebuilt from their rows, the others are kept
+    changed = list(changed)
+    rows = pd.MultiIndex.from_arrays([np.asarray(key) for key in keys]).isin(changed)
+    updated = {key: state for key, state in partitions.items() if key not in set(changed)}
+    if rows.any():
+        updated.update(partition_statistics(frame[rows], columns, [np.asarray(key)[rows] for key in keys]))
+    return dict(sorted(updated.items()))
+
+
+def _league_season_keys(frame):
+    return pd.MultiIndex.from_arrays(league_season_keys(frame))
+
+
+def ingest(matches_path=None, team_attributes_path=None, data_dir=None):
+    # Applies a delta of matches and/or team attribute snapshots and returns the new data version
+    stages = {name: pipeline.get(name, data_dir) for name in UPDATED_STAGES}
+    raw = {'Match': load_table('Match', data_dir), 'Team_Attributes': load_table('Team_Attributes', data_dir)}
+    teams_data = stages['teams_data']
+    matches_data = stages['matches_data']
+
+    first_new_snapshot = pd.Series(dtype='datetime64[ns]')
+    if team_attributes_path is not None:
+        attributes_delta = pd.read_csv(team_attributes_path, **read_csv_kwargs('Team_Attributes'))
+        raw['Team_Attributes'] = _append(raw['Team_Attributes'], attributes_delta)
+        new_snapshots = pd.merge(attributes_delta, load_table('Team', data_dir), on='team_api_id', how='inner')
+        teams_data = _append(teams_data, new_snapshots)
+        teams_data = teams_data.drop_duplicates(['team_api_id', 'date'], keep='last', ignore_index=True)
+        first_new_snapshot = new_snapshots.groupby('team_api_id')['date'].min()
+
+    changed_ids = np.array([], dtype=np.int64)
+    old_matches = matches_data.iloc[0:0]
+    if matches_path is not None:
+        matches_delta = _read_delta('Match', matches_path)
+        raw['Match'] = _append(raw['Match'], matches_delta)
+        # The column tables of Match.csv are extended too, so they are saved with the new rows
+        # instead of being parsed again from the CSV. Line-up and odds columns are optional in
+        # a delta, matches sent without them have none.
+        for name in _column_tables('Match'):
+            raw[name] = _append(load_table(name, data_dir), _read_delta(name, matches_path))
+        new_matches = add_match_outcomes(matches_delta[MATCH_COLUMNS])
+        changed_ids = new_matches['match_api_id'].to_numpy()
+        old_matches = matches_data[matches_data['match_api_id'].isin(changed_ids)]
+        matches_data = _append(matches_data, new_matches)
+        matches_data = matches_data.drop_duplicates('match_api_id', keep='last', ignore_index=True)
+
+    # Changed matches, plus matches played after a team's new snapshot as they may now be
+    # paired with it
+    affected = matches_data['match_api_id'].isin(changed_ids).to_numpy()
+    for column in ['home_team_api_id', 'away_team_api_id']:
+        since = matches_data[column].map(first_new_snapshot)
+        affected |= (matches_data['date'] >= since).to_numpy()
+
+    # Re-pair only the affected matches with their as-of snapshot and patch the result counts
+    affected_matches = matches_data[affected]
+    affected_ids = affected_matches['match_api_id'].to_numpy()
+    for side, team_column, result_column in [('home', 'home_team_api_id', 'HomeResults'),
+                                             ('away', 'away_team_api_id', 'AwayResults')]:
+        joined = stages['matches_' + side]
+        stale = joined['match_api_id'].isin(affected_ids).to_numpy()
+        repaired = asof_join_team_attributes(teams_data, affected_matches, team_column)
+        stages[side + '_result_counts'] = _update_counts(stages[side + '_result_counts'], joined[stale], repaired,
+                                                         result_column)
+        stages['matches_' + side] = _append(joined[~stale], repaired)
+
+    # Team-match rows and the league tables of the seasons the changed matches belong to
+    new_rows = team_match_long_table(matches_data[matches_data['match_api_id'].isin(changed_ids)])
+    team_matches = stages['team_matches']
+    team_matches = _append(team_matches[~team_matches['match_api_id'].isin(changed_ids)], new_rows)
+    seasons = _league_season_keys(old_matches).append(_league_season_keys(new_rows)).unique()
+    in_seasons = _league_season_keys(team_matches).isin(seasons)
+    standings = stages['standings']
+    kept = standings[~_league_season_keys(standings).isin(seasons)]
+    standings = _append(kept, build_standings(team_matches[in_seasons])) if in_seasons.any() else kept
+    order = np.lexsort((standings['rank'].to_numpy(), standings['stage'].to_numpy(),
+                        standings['season'].astype(str).to_numpy(), standings['league_id'].to_numpy()))
+    standings = standings.take(order).reset_index(drop=True)
+    standings['season'] = standings['season'].astype(pd.CategoricalDtype(sorted(standings['season'].unique())))
+
+    # Summary statistics of the league seasons that changed. The team statistics are small
+    # and depend on which league each team played in, they are rebuilt on next use.
+    stages['match_statistics'] = _update_statistics(stages['match_statistics'], matches_data,
+                                                    describe_columns(matches_data),
+                                                    league_season_keys(matches_data), seasons)
+
+    # Elo ratings continue from the last state when the delta only adds later matches, a
+    # change to a rated match means replaying the history
+    added = matches_data[matches_data['match_api_id'].isin(changed_ids)]
+    if old_matches.empty and can_continue(stages['elo']['state'], added):
+        stages['elo'] = continue_elo(stages['elo'], added)
+    else:
+        stages['elo'] = build_elo(matches_data)
+
+    stages.update(teams_data=teams_data, matches_data=matches_data, team_matches=team_matches,
+                  standings=standings, standings_index=index_standings(standings))
+
+    # Persist the delta, then re-key everything to the new data version
+    if team_attributes_path is not None:
+        _append_csv('Team_Attributes', team_attributes_path, data_dir)
+        store_table('Team_Attributes', raw['Team_Attributes'], data_dir)
+    if matches_path is not None:
+        _append_csv('Match', matches_path, data_dir)
+        for name in ['Match'] + _column_tables('Match'):
+            store_table(name, raw[name], data_dir)
+    version = data_version(data_dir)
+    for name, value in stages.items():
+        pipeline.put(name, value, data_dir, version)
+    return version
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Ingest new matches and team attribute snapshots.')
+    parser.add_argument('--matches', help='CSV of new or changed matches, with the Match.csv columns')
+    parser.add_argument('--team-attributes', help='CSV of new team attribute snapshots')
+    parser.add_argument('--data-dir', default=None, help='directory holding the CSVs (default: current directory)')
+    args = parser.parse_args(argv)
+    if args.matches is None and args.team_attributes is None:
+        parser.error('nothing to ingest, pass --matches and/or --team-attributes')
+
+    ingest(args.matches, args.team_attributes, args.data_dir)
+
+    # Save the updated tables and stages so server processes load them instead of recomputing
+    import snapshot
+
+    changed = [name for name, path in [('Match', args.matches), ('Team_Attributes', args.team_attributes)] if path]
+    if args.matches:
+        changed += _column_tables('Match')
+    snapshot.update_snapshot({name: load_table(name, args.data_dir) for name in changed}, args.data_dir)
+    pipeline.save(UPDATED_STAGES, args.data_dir)
+
+
+if __name__ == '__main__':
+    main()
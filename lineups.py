@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+from schemas import LINEUP_COLUMNS
+
+
+# Line-up ratings: every starting slot of Match.csv is resolved to the player's latest
+# attribute snapshot on or before the match date. All 22 slots of every match are looked
+# up at once with one binary search over the player store (see players.py), whose rows are
+# sorted by (player_api_id, date), so they are also sorted by a key packing the player's
+# position in the store above the snapshot day.
+
+# Snapshot days are stored in the low bits of the search keys, offset so days before 1970
+# stay positive
+DAY_BITS = 32
+DAY_OFFSET = 1 << 31
+
+
+def _days(dates):
+    return pd.DatetimeIndex(dates).values.astype('datetime64[D]').astype(np.int64) + DAY_OFFSET
+
+
+def snapshot_keys(store):
+    # Search key of every row of the player store, in store order
+    attributes = store['attributes']
+    runs = np.repeat(np.arange(len(store['starts']), dtype=np.int64), store['stops'] - store['starts'])
+    return (runs << DAY_BITS) | _days(attributes['date'])
+
+
+def resolve_ratings(store, player_ids, dates, attribute='overall_rating'):
+    # Value of an attribute for each (player, date) pair, taken from the player's latest
+    # snapshot on or before the date. NaN for missing players and for dates before a
+    # player's first snapshot.
+    player_ids = np.asarray(player_ids, dtype=np.float64)
+    store_ids = store['attributes']['player_api_id'].to_numpy()[store['starts']]
+    ratings = np.full(player_ids.shape, np.nan, dtype=np.float32)
+    known = ~np.isnan(player_ids)
+    if not len(store_ids) or not known.any():
+        return ratings
+
+    ids = player_ids[known].astype(np.int64)
+    runs = np.minimum(np.searchsorted(store_ids, ids), len(store_ids) - 1)
+    in_store = store_ids[runs] == ids
+    query = (runs.astype(np.int64) << DAY_BITS) | _days(np.asarray(dates)[known])
+    rows = np.searchsorted(snapshot_keys(store), query, side='right') - 1
+    found = in_store & (rows >= store['starts'][runs])
+    values = np.full(len(ids), np.nan, dtype=np.float32)
+    values[found] = store['attributes'][attribute].to_numpy(dtype=np.float32)[rows[found]]
+    ratings[known] = values
+    return ratings
+
+
+def lineup_ratings(lineups, store, attribute='overall_rating'):
+    # Matrix of the rating of every line-up slot, one row per match and one column per slot
+    # in LINEUP_COLUMNS order
+    slots = lineups[LINEUP_COLUMNS].to_numpy(dtype=np.float64)
+    dates = np.repeat(lineups['date'].to_numpy()[:, None], len(LINEUP_COLUMNS), axis=1)
+    return resolve_ratings(store, slots.ravel(), dates.ravel(), attribute).reshape(slots.shape)
+
+
+def lineup_strength(lineups, store, attribute='overall_rating'):
+    # Mean rating of the resolved starters of each side and how many of them were resolved
+    ratings = lineup_ratings(lineups, store, attribute)
+    strength = pd.DataFrame({'match_api_id': lineups['match_api_id'].to_numpy()})
+    for side, columns in [('home', slice(0, 11)), ('away', slice(11, 22))]:
+        side_ratings = ratings[:, columns]
+        rated = (~np.isnan(side_ratings)).sum(axis=1)
+        total = np.nansum(side_ratings, axis=1, dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            strength[side + '_strength'] = (total / rated).astype(np.float32)
+        strength[side + '_rated'] = rated.astype(np.int8)
+    strength['strength_difference'] = strength['home_strength'] - strength['away_strength']
+    return strength
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+from schemas import BOOKMAKERS, ODDS_COLUMNS
+
+
+# Bookmaker odds analysis. The 1X2 odds of every bookmaker are read as one float32 array of
+# shape (matches, bookmakers, 3) so every step below works on all bookmakers at once:
+#   implied probabilities: 1 / odds, divided by their sum so the overround (the bookmaker
+#       margin, by how much the raw probabilities add up to more than 1) is removed
+#   consensus: mean of the margin-free probabilities of the bookmakers quoting the match
+#   accuracy: Brier score of each bookmaker and of the consensus against the home result,
+#       and a calibration table of the consensus home win probability
+
+OUTCOMES = ['H', 'D', 'A']
+
+# Position of each home result in OUTCOMES: a home win (W) is H, a home loss (L) is A
+_RESULT_OUTCOMES = {'W': 0, 'D': 1, 'L': 2}
+
+CALIBRATION_BINS = 10
+
+
+def _nanmean(values, axis):
+    # Mean of the quoted values, NaN where there are none (without np.nanmean's warning)
+    counts = (~np.isnan(values)).sum(axis=axis)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.nansum(values, axis=axis) / counts
+
+
+def odds_array(matches):
+    # Odds of every bookmaker, quotes with a missing or impossible (<= 1) price set to NaN
+    odds = matches[ODDS_COLUMNS].to_numpy(dtype=np.float32).reshape(len(matches), len(BOOKMAKERS), 3)
+    invalid = ~(odds > 1).all(axis=2)
+    odds[invalid] = np.nan
+    return odds
+
+
+def implied_probabilities(odds):
+    # Margin-free probabilities and the overround of every bookmaker quote
+    raw = 1 / odds
+    total = raw.sum(axis=2)
+    return raw / total[:, :, None], total - 1
+
+
+def consensus_probabilities(probabilities):
+    # Mean over the bookmakers quoting each match, NaN for matches nobody quoted
+    quoted = (~np.isnan(probabilities[:, :, 0])).sum(axis=1)
+    return _nanmean(probabilities, axis=1).astype(np.float32), quoted
+
+
+def outcome_matrix(home_results):
+    # One-hot H/D/A outcome of every match from its home result
+    codes = pd.Series(home_results).astype(str).map(_RESULT_OUTCOMES).to_numpy(dtype=np.int64)
+    outcomes = np.zeros((len(codes), 3), dtype=np.float32)
+    outcomes[np.arange(len(codes)), codes] = 1
+    return outcomes
+
+
+def brier_scores(probabilities, outcomes):
+    # Squared error of the predicted probabilities summed over the three outcomes
+    return ((probabilities - outcomes) ** 2).sum(axis=-1)
+
+
+def calibration_table(predicted, observed, bins=CALIBRATION_BINS):
+    # Mean predicted probability and observed frequency of an outcome per probability bin
+    known = ~np.isnan(predicted)
+    predicted, observed = predicted[known], observed[known]
+    bin_index = np.minimum((predicted * bins).astype(np.int64), bins - 1)
+    counts = np.bincount(bin_index, minlength=bins)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        table = pd.DataFrame({
+            'bin': [f'{low / bins:.1f}-{(low + 1) / bins:.1f}' for low in range(bins)],
+            'matches': counts,
+            'predicted': np.bincount(bin_index, weights=predicted, minlength=bins) / counts,
+            'observed': np.bincount(bin_index, weights=observed, minlength=bins) / counts,
+        })
+    return table
+
+
+def analyse_odds(matches, matches_data):
+    # Per match consensus, per bookmaker accuracy and the consensus calibration, for the
+    # matches of matches_data (matches holds their odds, one row per match_api_id)
+    matches = matches.set_index('match_api_id').reindex(matches_data['match_api_id'].to_numpy())
+    probabilities, overround = implied_probabilities(odds_array(matches))
+    consensus, quoted = consensus_probabilities(probabilities)
+    outcomes = outcome_matrix(matches_data['HomeResults'])
+
+    bookmaker_brier = brier_scores(probabilities, outcomes[:, None, :])
+    bookmakers = pd.DataFrame({
+        'bookmaker': BOOKMAKERS,
+        'matches': (~np.isnan(bookmaker_brier)).sum(axis=0),
+        'overround': _nanmean(overround, axis=0),
+        'brier_score': _nanmean(bookmaker_brier, axis=0),
+    })
+    consensus_brier = brier_scores(consensus, outcomes)
+    per_match = pd.DataFrame({
+        'match_api_id': matches_data['match_api_id'].to_numpy(),
+        'bookmakers': quoted.astype(np.int8),
+        'home_probability': consensus[:, 0],
+        'draw_probability': consensus[:, 1],
+        'away_probability': consensus[:, 2],
+        'overround': _nanmean(overround, axis=1).astype(np.float32),
+        'brier_score': consensus_brier,
+    })
+    bookmakers.loc[len(bookmakers)] = ['consensus', int((~np.isnan(consensus_brier)).sum()), np.nan,
+                                       _nanmean(consensus_brier, axis=0)]
+    calibration = calibration_table(consensus[:, 0], outcomes[:, 0])
+    return {'matches': per_match, 'bookmakers': bookmakers, 'calibration': calibration}
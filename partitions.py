@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+
+# Partitioned tables: the rows of a frame grouped by (league_id, season), with the offsets
+# of every partition, so the rows of a league/season selection are a few slices and
+# selecting them costs time in proportion to the rows selected, not to the whole table.
+#
+# A selection is a (league_ids, seasons) pair of tuples, None standing for all of them.
+# Partition keys are (league_id, season) tuples, with league 0 for team snapshots of a
+# season in which the team played no match of the dataset.
+
+NO_LEAGUE = 0
+
+
+def partition(frame, keys):
+    # Sorts the frame by the key arrays and records the offsets of every key
+    keys = [np.asarray(key) for key in keys]
+    order = np.lexsort(keys[::-1]) if len(frame) else np.array([], dtype=int)
+    rows = frame.take(order).reset_index(drop=True)
+    keys = [key[order] for key in keys]
+    changes = np.zeros(len(rows), dtype=bool)
+    if len(rows):
+        changes[0] = True
+        for key in keys:
+            changes[1:] |= key[1:] != key[:-1]
+    starts = np.flatnonzero(changes)
+    stops = np.append(starts[1:], len(rows))
+    partition_keys = zip(*(key[starts].tolist() for key in keys))
+    offsets = {name: (int(start), int(stop)) for name, start, stop in zip(partition_keys, starts, stops)}
+    return {'rows': rows, 'keys': keys, 'offsets': offsets}
+
+
+def league_season_keys(frame):
+    return [frame['league_id'].to_numpy(), frame['season'].astype(str).to_numpy()]
+
+
+def team_league_seasons(team_matches):
+    # The league each team played in each season, the one with most of its matches
+    counts = team_matches.groupby(['team_api_id', team_matches['season'].astype(str), 'league_id'],
+                                  observed=True).size()
+    counts = counts.sort_values(ascending=False, kind='stable')
+    counts = counts[~counts.index.droplevel('league_id').duplicated()]
+    return pd.Series(counts.index.get_level_values('league_id'), index=counts.index.droplevel('league_id'))
+
+
+def team_partition_keys(teams_data, team_matches, seasons):
+    # (league_id, season) of every team snapshot, from the season of its snapshot date
+    leagues = team_league_seasons(team_matches)
+    snapshot_keys = pd.MultiIndex.from_arrays([teams_data['team_api_id'].to_numpy(), seasons])
+    league_ids = leagues.reindex(snapshot_keys).fillna(NO_LEAGUE).to_numpy(dtype=np.int64)
+    return [league_ids, np.asarray(seasons)]
+
+
+def selection_filter(selection):
+    # Predicate over partition keys for a selection, None when everything is selected
+    if selection is None:
+        return None
+    leagues, seasons = selection
+    if leagues is None and seasons is None:
+        return None
+    leagues = None if leagues is None else set(leagues)
+    seasons = None if seasons is None else set(seasons)
+    return lambda key: (leagues is None or key[0] in leagues) and (seasons is None or key[1] in seasons)
+
+
+def selection_key(selection):
+    # Hashable form of a selection that does not depend on the order things were picked in,
+    # None when everything is selected
+    if selection_filter(selection) is None:
+        return None
+    return tuple(None if values is None else tuple(sorted(values)) for values in selection)
+
+
+def select(partitioned, selection=None):
+    # Rows of the selected partitions, the partitioned frame itself when nothing is filtered
+    keep = selection_filter(selection)
+    if keep is None:
+        return partitioned['rows']
+    ranges = [offsets for key, offsets in partitioned['offsets'].items() if keep(key)]
+    if not ranges:
+        return partitioned['rows'].iloc[0:0]
+    return partitioned['rows'].take(np.concatenate([np.arange(start, stop) for start, stop in ranges]))
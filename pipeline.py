@@ -0,0 +1,298 @@
+import os
+import pickle
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_loader import data_version, load_table, schema_version, snapshot_path
+from elo import build_elo
+from features import (add_match_outcomes, asof_join_team_attributes, build_team_matches, result_counts,
+                      team_attribute_means, team_match_long_table)
+from form import form_features
+from head_to_head import build_head_to_head
+from lineups import lineup_strength
+from odds import analyse_odds
+from partitions import league_season_keys, partition, team_partition_keys
+from players import build_player_store, season_of, season_ratings
+from schemas import (COLUMN_TABLES, MATCH_COLUMNS, PLAYER_RATINGS, TABLE_NAMES, TEAM_CLASS_ATTRIBUTES,
+                     TEAM_NUMERIC_ATTRIBUTES)
+from similarity import build_team_vectors, neighbour_table
+from standings import build_standings, index_standings
+from summaries import correlation, describe_columns, partition_statistics, select_statistics
+
+
+# Derived frames are named stages of a small dependency graph. A stage is built the first
+# time something asks for it, from its (recursively built) dependencies, and the result
+# is kept per data version and shared by every session of the server process. Raw tables
+# are leaves of the graph and come straight from the data loader.
+#
+# Stages can also be saved next to the snapshot (see save()), so a fresh server process
+# picks up results computed by a batch job, e.g. after an incremental ingest, instead of
+# rebuilding them.
+STAGE_DIR = 'stages'
+
+# Bump when a stage changes what it returns so stages saved by older code are rebuilt
+STAGE_FORMAT = 1
+
+_stages = {}
+_results = {}
+_stage_locks = {}
+_results_lock = threading.Lock()
+
+
+def stage(*dependencies):
+    # Registers the decorated function as a stage built from the named dependencies
+    def register(build):
+        _stages[build.__name__] = (build, dependencies)
+        return build
+    return register
+
+
+def dependencies(name):
+    return _stages[name][1] if name in _stages else ()
+
+
+def _lock_for(key):
+    with _results_lock:
+        return _stage_locks.setdefault(key, threading.Lock())
+
+
+def _get(name, data_dir, version):
+    if name in TABLE_NAMES or name in COLUMN_TABLES:
+        return load_table(name, data_dir)
+
+    key = (name, data_dir)
+    with _lock_for(key):
+        cached = _results.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        value = _read_saved(name, data_dir, version)
+        if value is None:
+            build, names = _stages[name]
+            value = build(*(_get(dependency, data_dir, version) for dependency in names))
+        # Only the latest version of a stage is kept
+        _results[key] = (version, value)
+        return value
+
+
+def get(name, data_dir=None):
+    # Returns the named stage for the current data, building it and its dependencies if needed.
+    # Results are shared between sessions, so callers must copy before mutating them.
+    return _get(name, data_dir, data_version(data_dir))
+
+
+def put(name, value, data_dir=None, version=None):
+    # Installs a stage result computed outside the graph, e.g. updated incrementally
+    key = (name, data_dir)
+    with _lock_for(key):
+        _results[key] = (version or data_version(data_dir), value)
+
+
+def _saved_path(name, data_dir):
+    return snapshot_path(os.path.join(STAGE_DIR, name + '.pkl'), data_dir)
+
+
+def _saved_header(version):
+    # Saved stages are only valid for the data, the table schemas and the stage code they were
+    # built from, and for the pandas and numpy versions that pickled them
+    return (STAGE_FORMAT, schema_version(), version, pd.__version__, np.__version__)
+
+
+def _read_saved(name, data_dir, version):
+    # The header is pickled first so stale files are rejected without loading the value. A file
+    # that cannot be unpickled (e.g. written by other library versions) is a miss, the stage is
+    # rebuilt and the file overwritten by the next save().
+    try:
+        with open(_saved_path(name, data_dir), 'rb') as f:
+            if pickle.load(f) != _saved_header(version):
+                return None
+            return pickle.load(f)
+    except Exception:
+        return None
+
+
+def save(names, data_dir=None):
+    # Writes the current result of each named stage next to the snapshot
+    version = data_version(data_dir)
+    os.makedirs(snapshot_path(STAGE_DIR, data_dir), exist_ok=True)
+    for name in names:
+        value = _get(name, data_dir, version)
+        tmp_path = _saved_path(name, data_dir) + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(_saved_header(version), f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, _saved_path(name, data_dir))
+
+
+def clear_cache():
+    with _results_lock:
+        _results.clear()
+
+
+# Team attributes joined with team names. Snapshots re-sent by an incremental ingest are
+# appended to Team_Attributes.csv, so the last row of a (team, date) pair wins.
+@stage('Team_Attributes', 'Team')
+def teams_data(team_attributes, teams):
+    teams_data = pd.merge(team_attributes, teams, on='team_api_id', how='inner')
+    return teams_data.drop_duplicates(['team_api_id', 'date'], keep='last', ignore_index=True)
+
+
+# Match columns used by the app plus the outcome columns. Changed matches are appended to
+# Match.csv by an incremental ingest, so the last row of a match wins.
+@stage('Match')
+def matches_data(matches):
+    matches = matches[MATCH_COLUMNS].drop_duplicates('match_api_id', keep='last', ignore_index=True)
+    return add_match_outcomes(matches)
+
+
+# Every match with the home team attributes in force at kick-off
+@stage('teams_data', 'matches_data')
+def matches_home(teams_data, matches_data):
+    return asof_join_team_attributes(teams_data, matches_data, 'home_team_api_id')
+
+
+# Every match with the away team attributes in force at kick-off
+@stage('teams_data', 'matches_data')
+def matches_away(teams_data, matches_data):
+    return asof_join_team_attributes(teams_data, matches_data, 'away_team_api_id')
+
+
+# Home and away matches of every team in one long table
+@stage('matches_home', 'matches_away')
+def all_matches(matches_home, matches_away):
+    return build_team_matches(matches_home, matches_away)
+
+
+# Mean of every numerical attribute per team, the table behind the top teams view
+@stage('teams_data')
+def team_means(teams_data):
+    return team_attribute_means(teams_data, TEAM_NUMERIC_ATTRIBUTES)
+
+
+# Summary statistics of the numerical team attributes per league and season
+@stage('team_partitions')
+def team_statistics(team_partitions):
+    return partition_statistics(team_partitions['rows'], TEAM_NUMERIC_ATTRIBUTES, team_partitions['keys'])
+
+
+# Correlations between the numerical team attributes
+@stage('team_statistics')
+def team_correlations(team_statistics):
+    return correlation(select_statistics(team_statistics))
+
+
+# Summary statistics of the match columns per league and season
+@stage('matches_data')
+def match_statistics(matches_data):
+    return partition_statistics(matches_data, describe_columns(matches_data), league_season_keys(matches_data))
+
+
+# Home result counts for every team attribute class, the cells behind the home heatmaps
+@stage('matches_home')
+def home_result_counts(matches_home):
+    return result_counts(matches_home, TEAM_CLASS_ATTRIBUTES, 'HomeResults')
+
+
+# Away result counts for every team attribute class, the cells behind the away heatmaps
+@stage('matches_away')
+def away_result_counts(matches_away):
+    return result_counts(matches_away, TEAM_CLASS_ATTRIBUTES, 'AwayResults')
+
+
+# Every match from each team's point of view, two rows per match
+@stage('matches_data')
+def team_matches(matches_data):
+    return team_match_long_table(matches_data)
+
+
+# League tables after every stage of every league season
+@stage('team_matches')
+def standings(team_matches):
+    return build_standings(team_matches)
+
+
+# Offsets of each league table in the standings rows
+@stage('standings')
+def standings_index(standings):
+    return index_standings(standings)
+
+
+# Player attributes sorted by player and date with the offsets of each player
+@stage('Player_Attributes')
+def player_store(player_attributes):
+    return build_player_store(player_attributes)
+
+
+# Mean rating of every player per season
+@stage('player_store')
+def player_season_ratings(player_store):
+    return season_ratings(player_store, PLAYER_RATINGS)
+
+
+# Mean rating of the home and away starters of every match, resolved as of the match date
+@stage('Match_Lineups', 'player_store')
+def match_strength(match_lineups, player_store):
+    lineups = match_lineups.drop_duplicates('match_api_id', keep='last')
+    return lineup_strength(lineups, player_store)
+
+
+# Standardized attribute vectors of every team snapshot, grouped by snapshot date
+@stage('teams_data')
+def team_vectors(teams_data):
+    return build_team_vectors(teams_data, TEAM_NUMERIC_ATTRIBUTES)
+
+
+# The ten most similar teams of every team snapshot by cosine similarity
+@stage('team_vectors')
+def team_neighbours(team_vectors):
+    return neighbour_table(team_vectors, k=10)
+
+
+# Team snapshots grouped by the league the team played in during the season of the snapshot
+@stage('teams_data', 'team_matches')
+def team_partitions(teams_data, team_matches):
+    seasons = np.asarray(season_of(teams_data['date'])).astype(str)
+    return partition(teams_data, team_partition_keys(teams_data, team_matches, seasons))
+
+
+# Matches grouped by league and season
+@stage('matches_data')
+def match_partitions(matches_data):
+    return partition(matches_data, league_season_keys(matches_data))
+
+
+# Matches with the home team attributes, grouped by league and season
+@stage('matches_home')
+def home_partitions(matches_home):
+    return partition(matches_home, league_season_keys(matches_home))
+
+
+# Matches with the away team attributes, grouped by league and season
+@stage('matches_away')
+def away_partitions(matches_away):
+    return partition(matches_away, league_season_keys(matches_away))
+
+
+# Elo ratings of every team before and after each match, with the state after the last one
+@stage('matches_data')
+def elo(matches_data):
+    return build_elo(matches_data)
+
+
+# Form of both teams going into every match over their last 5 and 10 matches
+@stage('team_matches')
+def team_form(team_matches):
+    return form_features(team_matches)
+
+
+# Matches grouped by team pair with the head-to-head totals of every pair
+@stage('matches_data')
+def head_to_head_index(matches_data):
+    return build_head_to_head(matches_data)
+
+
+# Bookmaker consensus probabilities of every match, with the accuracy of each bookmaker
+@stage('Match_Odds', 'matches_data')
+def odds_analysis(match_odds, matches_data):
+    return analyse_odds(match_odds.drop_duplicates('match_api_id', keep='last'), matches_data)
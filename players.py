@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from features import top_positions
+
+
+# Player attribute store: Player_Attributes sorted by (player_api_id, date) with the row
+# offsets of every player, so one player's rating history is a slice and per-player
+# reductions work on contiguous runs of rows.
+
+
+def build_player_store(player_attributes):
+    attributes = player_attributes.sort_values(['player_api_id', 'date'], kind='stable', ignore_index=True)
+    player_ids = attributes['player_api_id'].to_numpy()
+    starts = np.array([], dtype=int)
+    if len(player_ids):
+        starts = np.flatnonzero(np.r_[True, player_ids[1:] != player_ids[:-1]])
+    stops = np.append(starts[1:], len(attributes))
+    offsets = {int(player_ids[start]): (int(start), int(stop)) for start, stop in zip(starts, stops)}
+    return {'attributes': attributes, 'offsets': offsets, 'starts': starts, 'stops': stops}
+
+
+def player_history(store, player_api_id):
+    # All attribute snapshots of a player, oldest first (empty for an unknown player)
+    start, stop = store['offsets'].get(int(player_api_id), (0, 0))
+    return store['attributes'].iloc[start:stop]
+
+
+def latest_ratings(store):
+    # The most recent snapshot of every player, one row per player
+    return store['attributes'].take(store['stops'] - 1).reset_index(drop=True)
+
+
+def top_players(store, players, attribute, n=10, largest=True):
+    # The n players with the highest (or lowest) current value of an attribute, best first
+    latest = latest_ratings(store)
+    top = latest.iloc[top_positions(latest[attribute], n, largest)][['player_api_id', 'date', attribute]]
+    names = players.set_index('player_api_id')['player_name']
+    return top.assign(player_name=top['player_api_id'].map(names))[['player_name', 'player_api_id', 'date', attribute]]
+
+
+def season_of(dates):
+    # Football season of each date, e.g. '2015/2016' for any date from July 2015 to June 2016
+    dates = pd.DatetimeIndex(dates)
+    if not len(dates):
+        return pd.Categorical([])
+    start_year = np.asarray(dates.year - (dates.month < 7))
+    first, last = start_year.min(), start_year.max()
+    return pd.Categorical.from_codes(start_year - first, [f'{year}/{year + 1}' for year in range(first, last + 1)])
+
+
+def season_ratings(store, attributes):
+    # Mean of each attribute per player and season
+    history = store['attributes']
+    seasons = season_of(history['date'])
+    return history.groupby([history['player_api_id'], pd.Series(seasons, name='season', index=history.index)],
+                           observed=True)[attributes].mean()
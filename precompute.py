@@ -0,0 +1,77 @@
+import argparse
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+
+import pipeline
+import render_cache
+from data_loader import snapshot_path
+from views import CHART_VARIABLES, chart_image
+
+
+# Warm-up command: builds the stages every chart needs, saves them next to the snapshot and
+# renders every chart of the app for every variable in a process pool, writing the images
+# to the render cache directory the app reads from. Run it at deploy time or after a data
+# refresh.
+#
+#     python precompute.py [--data-dir DIR] [--workers N] [--theme dark]
+
+matplotlib.use('Agg')
+
+# Stages behind the precomputed charts and tables, plus the slower derived tables
+PRECOMPUTED_STAGES = ['teams_data', 'matches_data', 'team_means', 'team_correlations', 'home_result_counts',
+                      'away_result_counts', 'team_matches', 'standings', 'standings_index', 'player_store',
+                      'match_strength', 'elo', 'team_form', 'odds_analysis']
+
+
+def render_job(kind, variable, data_dir=None, theme=None, format='png', selection=None, path=None):
+    return (kind, variable, data_dir, theme, format, selection, path)
+
+
+def _render(job):
+    # Worker: renders a chart into the shared render cache, and copies it to path if given
+    kind, variable, data_dir, theme, format, selection, path = job
+    render_cache.use_disk(snapshot_path(render_cache.RENDER_DIR, data_dir))
+    image = chart_image(kind, variable, data_dir, theme, format, selection)
+    if path is not None:
+        with open(path, 'wb') as f:
+            f.write(image)
+    return kind, variable
+
+
+def render_charts(jobs, data_dir=None, workers=None, stages=PRECOMPUTED_STAGES):
+    # Stages are built once here; the workers load the saved copies instead of rebuilding them
+    pipeline.save(stages, data_dir)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_render, jobs))
+
+
+def precompute(data_dir=None, workers=None, theme=None):
+    # Images of older data versions are never read again
+    render_dir = snapshot_path(render_cache.RENDER_DIR, data_dir)
+    shutil.rmtree(render_dir, ignore_errors=True)
+    os.makedirs(render_dir)
+
+    jobs = [render_job(kind, variable, data_dir, theme) for kind, variables in CHART_VARIABLES.items()
+            for variable in variables]
+    return render_charts(jobs, data_dir, workers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Precompute the charts and tables of the app.')
+    parser.add_argument('--data-dir', default=None, help='directory holding the CSVs (default: current directory)')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per core)')
+    parser.add_argument('--theme', default=None, choices=['light', 'dark'],
+                        help="theme.base the app is deployed with (default: unset)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    rendered = precompute(args.data_dir, args.workers, args.theme)
+    print(f"Rendered {len(rendered)} charts in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
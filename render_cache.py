@@ -0,0 +1,129 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+
+# Encoded chart images keyed by view parameters, e.g. (chart type, variable, data version,
+# theme), shared by every session of the server process. Least recently used images are
+# evicted once the cache holds more than MAX_BYTES.
+#
+# With use_disk(), images are also kept in a directory shared between processes, so charts
+# rendered by the precompute command (see precompute.py) are served without redrawing.
+# Reading an image refreshes its mtime, and the least recently used files are deleted once
+# the directory holds more than MAX_DISK_BYTES.
+MAX_BYTES = 64 * 1024 * 1024
+MAX_DISK_BYTES = 512 * 1024 * 1024
+
+# Directory of the shared render cache, next to the snapshot
+RENDER_DIR = 'renders'
+
+# Same encoding settings st.pyplot uses
+SAVEFIG_KWARGS = {'bbox_inches': 'tight', 'dpi': 200}
+
+_images = OrderedDict()
+_cache_lock = threading.Lock()
+_total_bytes = 0
+_disk_dir = None
+
+
+def use_disk(path):
+    global _disk_dir
+
+    os.makedirs(path, exist_ok=True)
+    _disk_dir = path
+
+
+def _disk_path(key):
+    return os.path.join(_disk_dir, hashlib.sha1(repr(key).encode()).hexdigest() + '.' + key[0])
+
+
+def _read_disk(key):
+    path = _disk_path(key)
+    try:
+        with open(path, 'rb') as f:
+            image = f.read()
+        os.utime(path)
+        return image
+    except OSError:
+        return None
+
+
+def _prune_disk():
+    # Deletes the least recently used images until the directory is back under MAX_DISK_BYTES.
+    # Other processes may prune at the same time, so files can vanish under us.
+    files = []
+    for entry in os.scandir(_disk_dir):
+        if entry.name.endswith('.tmp'):
+            continue
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        files.append((stat.st_mtime_ns, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= MAX_DISK_BYTES:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
+
+
+def _write_disk(key, image):
+    path = _disk_path(key)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(image)
+    os.replace(tmp_path, path)
+    _prune_disk()
+
+
+def encode(fig, format='png'):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=format, **SAVEFIG_KWARGS)
+    return buffer.getvalue()
+
+
+def render(key, draw, format='png'):
+    # Returns the encoded image for key, calling draw() to build the figure only on a miss
+    global _total_bytes
+
+    key = (format,) + tuple(key)
+    with _cache_lock:
+        image = _images.get(key)
+        if image is not None:
+            _images.move_to_end(key)
+            return image
+
+    # Rendering happens outside the lock so a slow chart does not block cache hits
+    image = _read_disk(key) if _disk_dir else None
+    if image is None:
+        image = encode(draw(), format)
+        if _disk_dir:
+            _write_disk(key, image)
+
+    with _cache_lock:
+        if key not in _images:
+            _images[key] = image
+            _total_bytes += len(image)
+        while _total_bytes > MAX_BYTES and len(_images) > 1:
+            _, evicted = _images.popitem(last=False)
+            _total_bytes -= len(evicted)
+    return image
+
+
+def cache_info():
+    with _cache_lock:
+        return {'images': len(_images), 'bytes': _total_bytes, 'max_bytes': MAX_BYTES}
+
+
+def clear_cache():
+    global _total_bytes
+
+    with _cache_lock:
+        _images.clear()
+        _total_bytes = 0
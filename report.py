@@ -0,0 +1,142 @@
+import argparse
+import html
+import os
+import time
+
+import matplotlib
+
+import summaries
+import views
+from partitions import selection_key
+from precompute import render_charts, render_job
+from schemas import TEAM_CLASS_ATTRIBUTES, TEAM_NUMERIC_ATTRIBUTES
+
+
+# Headless report: every chart of the app for every variable, and the tables behind them,
+# written to a directory with an index.html linking them together. Charts are rendered in
+# a process pool through the same views and render cache as the app, so charts already
+# rendered by the app or by precompute.py are copied instead of drawn again.
+#
+#     python report.py report/ [--data-dir DIR] [--workers N] [--format svg]
+#                              [--leagues 1729 4769] [--seasons 2014/2015 2015/2016]
+
+matplotlib.use('Agg')
+
+# Section titles of the chart kinds, in report order
+SECTIONS = {
+    'histogram': 'Distribution of the numerical team attributes',
+    'category_bar_chart': 'Distribution of the categorical team attributes',
+    'correlation_heatmap': 'Correlations between the numerical team attributes',
+    'top_teams_bar_chart': 'Top 10 teams by team attribute',
+    'home_results_heatmap': 'Home results by team attribute class',
+    'away_results_heatmap': 'Away results by team attribute class',
+}
+
+
+def _chart_filename(kind, variable, format):
+    return f'{kind}_{variable}.{format}' if variable else f'{kind}.{format}'
+
+
+def report_tables(data_dir=None, selection=None):
+    # Tables of the report by file name, None for tables the selection leaves empty
+    team_statistics = views.team_statistics(selection, data_dir)
+    match_statistics = views.match_statistics(selection, data_dir)
+    tables = {
+        'team_statistics': None if team_statistics is None else summaries.describe(team_statistics),
+        'team_correlations': None if team_statistics is None else summaries.correlation(team_statistics),
+        'match_statistics': None if match_statistics is None else summaries.describe(match_statistics),
+    }
+    for attribute in TEAM_NUMERIC_ATTRIBUTES:
+        top_teams = views.top_teams_table(attribute, n=10, data_dir=data_dir, selection=selection)
+        tables[f'top_teams_{attribute}'] = top_teams.reset_index(drop=True)
+    for side in ['home', 'away']:
+        for variable in TEAM_CLASS_ATTRIBUTES:
+            tables[f'{side}_results_{variable}'] = views.results_table(side, variable, data_dir, selection)
+    return tables
+
+
+def _section_tables(kind, variable):
+    # Names of the tables shown under a chart
+    if kind == 'histogram' and variable == TEAM_NUMERIC_ATTRIBUTES[0]:
+        return ['team_statistics']
+    if kind == 'correlation_heatmap':
+        return ['team_correlations']
+    if kind == 'top_teams_bar_chart':
+        return [f'top_teams_{variable}']
+    if kind in ('home_results_heatmap', 'away_results_heatmap'):
+        return [f"{kind.split('_')[0]}_results_{variable}"]
+    return []
+
+
+def _write_index(out_dir, charts, tables, selection, format):
+    leagues, seasons = selection or (None, None)
+    lines = ['<!DOCTYPE html>', '<html><head><meta charset="utf-8">',
+             '<title>European Football Analysis report</title></head><body>',
+             '<h1>European Football Analysis report</h1>',
+             f'<p>Leagues: {html.escape(", ".join(map(str, leagues)) if leagues else "all")}; '
+             f'seasons: {html.escape(", ".join(seasons) if seasons else "all")}</p>']
+    for kind, title in SECTIONS.items():
+        lines.append(f'<h2>{html.escape(title)}</h2>')
+        for variable in views.CHART_VARIABLES[kind]:
+            if (kind, variable) not in charts:
+                continue
+            if variable:
+                lines.append(f'<h3>{html.escape(variable)}</h3>')
+            lines.append(f'<img src="charts/{_chart_filename(kind, variable, format)}" style="max-width: 100%">')
+            for name in _section_tables(kind, variable):
+                if tables.get(name) is not None:
+                    lines.append(f'<p><a href="tables/{name}.csv">{name}.csv</a></p>')
+                    lines.append(tables[name].to_html(float_format=lambda value: f'{value:.3f}'))
+    if tables.get('match_statistics') is not None:
+        lines.append('<h2>Descriptive statistics of the matches</h2>')
+        lines.append('<p><a href="tables/match_statistics.csv">match_statistics.csv</a></p>')
+        lines.append(tables['match_statistics'].to_html(float_format=lambda value: f'{value:.3f}'))
+    lines.append('</body></html>')
+    with open(os.path.join(out_dir, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines))
+
+
+def build_report(out_dir, data_dir=None, workers=None, format='png', selection=None):
+    # Writes every chart and table of the app to out_dir and returns the number of charts
+    os.makedirs(os.path.join(out_dir, 'charts'), exist_ok=True)
+    os.makedirs(os.path.join(out_dir, 'tables'), exist_ok=True)
+
+    jobs = [render_job(kind, variable, data_dir, format=format, selection=selection,
+                       path=os.path.join(out_dir, 'charts', _chart_filename(kind, variable, format)))
+            for kind in SECTIONS for variable in views.CHART_VARIABLES[kind]]
+    # Only the stages behind the charts are built, not the slower ones precompute.py also saves
+    stages = views.CHART_STAGES + (views.SELECTION_STAGES if selection_key(selection) is not None else [])
+    charts = set(render_charts(jobs, data_dir, workers, stages))
+
+    # Tables are built in this process, which already holds the stages saved for the workers
+    tables = report_tables(data_dir, selection)
+    for name, table in tables.items():
+        if table is not None:
+            table.to_csv(os.path.join(out_dir, 'tables', name + '.csv'))
+
+    _write_index(out_dir, charts, tables, selection, format)
+    return len(charts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write every chart and table of the app to a report directory.')
+    parser.add_argument('out_dir', help='directory to write the report to')
+    parser.add_argument('--data-dir', default=None, help='directory holding the CSVs (default: current directory)')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per core)')
+    parser.add_argument('--format', default='png', choices=['png', 'svg', 'pdf'], help='image format of the charts')
+    parser.add_argument('--leagues', type=int, nargs='+', help='only include these league ids')
+    parser.add_argument('--seasons', nargs='+', help='only include these seasons, e.g. 2015/2016')
+    args = parser.parse_args(argv)
+
+    selection = None
+    if args.leagues or args.seasons:
+        selection = (tuple(sorted(args.leagues)) if args.leagues else None,
+                     tuple(sorted(args.seasons)) if args.seasons else None)
+
+    start = time.perf_counter()
+    rendered = build_report(args.out_dir, args.data_dir, args.workers, args.format, selection)
+    print(f"Wrote {rendered} charts to {args.out_dir} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+import numpy as np
+
+
+# Creating a list containing all dataset names
+TABLE_NAMES = ['Country', 'League', 'Player', 'Team', 'Team_Attributes', 'Player_Attributes', 'Match']
+
+# Column groups of a wide CSV that only a few stages need, loaded as tables of their own on
+# first use so the default load of the CSV stays pruned. Maps each one to its source CSV.
+COLUMN_TABLES = {'Match_Lineups': 'Match', 'Match_Odds': 'Match'}
+
+# Every date column in the dataset uses the same layout, e.g. '2008-08-17 00:00:00'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Numerical team playing attributes, in the order the app lists them
+TEAM_NUMERIC_ATTRIBUTES = ['defenceAggression', 'defenceTeamWidth', 'defencePressure',
+                           'buildUpPlayPassing', 'chanceCreationCrossing',
+                           'chanceCreationShooting', 'chanceCreationPassing', 'buildUpPlaySpeed']
+
+# Categorical team playing attributes
+TEAM_CLASS_ATTRIBUTES = ['buildUpPlaySpeedClass', 'buildUpPlayDribblingClass', 'buildUpPlayPassingClass',
+                         'buildUpPlayPositioningClass', 'chanceCreationPassingClass', 'chanceCreationCrossingClass',
+                         'chanceCreationShootingClass', 'chanceCreationPositioningClass', 'defencePressureClass',
+                         'defenceAggressionClass', 'defenceTeamWidthClass', 'defenceDefenderLineClass']
+
+# Player ratings, all of them have missing values for a handful of players
+PLAYER_RATINGS = ['overall_rating', 'potential', 'crossing', 'finishing', 'heading_accuracy', 'short_passing',
+                  'volleys', 'dribbling', 'curve', 'free_kick_accuracy', 'long_passing', 'ball_control',
+                  'acceleration', 'sprint_speed', 'agility', 'reactions', 'balance', 'shot_power', 'jumping',
+                  'stamina', 'strength', 'long_shots', 'aggression', 'interceptions', 'positioning', 'vision',
+                  'penalties', 'marking', 'standing_tackle', 'sliding_tackle', 'gk_diving', 'gk_handling',
+                  'gk_kicking', 'gk_positioning', 'gk_reflexes']
+
+# The Match.csv columns describing a match, out of ~115
+MATCH_COLUMNS = ['id', 'country_id', 'league_id', 'season', 'stage', 'date', 'match_api_id',
+                 'home_team_api_id', 'away_team_api_id', 'home_team_goal', 'away_team_goal']
+
+# Player ids of the starting line-ups, missing for some matches. Ids are below 2**24 so
+# float32 holds them exactly and the missing slots stay NaN.
+LINEUP_COLUMNS = ([f'home_player_{slot}' for slot in range(1, 12)] +
+                  [f'away_player_{slot}' for slot in range(1, 12)])
+
+# Bookmakers quoting 1X2 odds in Match.csv, each with a home win (H), draw (D) and away win
+# (A) column, e.g. B365H, B365D, B365A. Odds are missing for the matches a bookmaker did
+# not cover.
+BOOKMAKERS = ['B365', 'BW', 'IW', 'LB', 'PS', 'WH', 'SJ', 'VC', 'GB', 'BS']
+ODDS_COLUMNS = [bookmaker + outcome for bookmaker in BOOKMAKERS for outcome in 'HDA']
+
+# XML blobs of Match.csv describing the events of a match, see events.py
+MATCH_EVENT_COLUMNS = ['goal', 'shoton', 'shotoff', 'foulcommit', 'card', 'cross', 'corner', 'possession']
+
+# Schema registry: for each table the columns to read (None reads them all), the compact
+# dtype of each column and the columns to parse as dates
+TABLE_SCHEMAS = {
+    'Country': {
+        'usecols': None,
+        'dtype': {'id': np.int32},
+        'parse_dates': [],
+    },
+    'League': {
+        'usecols': None,
+        'dtype': {'id': np.int32, 'country_id': np.int32},
+        'parse_dates': [],
+    },
+    'Player': {
+        'usecols': None,
+        'dtype': {'id': np.int32, 'player_api_id': np.int32, 'player_fifa_api_id': np.int32,
+                  'height': np.float32, 'weight': np.int16},
+        'parse_dates': ['birthday'],
+    },
+    'Team': {
+        # team_fifa_api_id is missing for a few teams so it keeps the default float dtype
+        'usecols': None,
+        'dtype': {'id': np.int32, 'team_api_id': np.int32},
+        'parse_dates': [],
+    },
+    'Team_Attributes': {
+        'usecols': None,
+        'dtype': {'id': np.int32, 'team_fifa_api_id': np.int32, 'team_api_id': np.int32,
+                  # buildUpPlayDribbling is only recorded from 2014 onwards
+                  'buildUpPlayDribbling': np.float32,
+                  **{name: np.int16 for name in TEAM_NUMERIC_ATTRIBUTES},
+                  **{name: 'category' for name in TEAM_CLASS_ATTRIBUTES}},
+        'parse_dates': ['date'],
+    },
+    'Player_Attributes': {
+        'usecols': None,
+        'dtype': {'id': np.int32, 'player_fifa_api_id': np.int32, 'player_api_id': np.int32,
+                  'preferred_foot': 'category', 'attacking_work_rate': 'category',
+                  'defensive_work_rate': 'category',
+                  **{name: np.float32 for name in PLAYER_RATINGS}},
+        'parse_dates': ['date'],
+    },
+    'Match': {
+        'usecols': MATCH_COLUMNS,
+        'dtype': {'id': np.int32, 'country_id': np.int32, 'league_id': np.int32, 'season': 'category',
+                  'stage': np.int8, 'match_api_id': np.int32, 'home_team_api_id': np.int32,
+                  'away_team_api_id': np.int32, 'home_team_goal': np.int8, 'away_team_goal': np.int8},
+        'parse_dates': ['date'],
+    },
+    'Match_Lineups': {
+        'usecols': ['match_api_id', 'date'] + LINEUP_COLUMNS,
+        'dtype': {'match_api_id': np.int32, **{name: np.float32 for name in LINEUP_COLUMNS}},
+        'parse_dates': ['date'],
+    },
+    'Match_Odds': {
+        'usecols': ['match_api_id'] + ODDS_COLUMNS,
+        'dtype': {'match_api_id': np.int32, **{name: np.float32 for name in ODDS_COLUMNS}},
+        'parse_dates': [],
+    },
+}
+
+
+def read_csv_kwargs(name):
+    # Keyword arguments for pd.read_csv that apply the schema of a table
+    schema = TABLE_SCHEMAS[name]
+    kwargs = {'dtype': schema['dtype']}
+    if schema['usecols'] is not None:
+        kwargs['usecols'] = schema['usecols']
+    if schema['parse_dates']:
+        kwargs['parse_dates'] = schema['parse_dates']
+        kwargs['date_format'] = DATE_FORMAT
+    return kwargs
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+
+# Similar-team search: every team attribute snapshot is standardized (z-scores over the
+# whole history) and stored as one row of a contiguous float32 matrix. Rows are grouped by
+# snapshot date, so the teams a snapshot can be compared with are a block of rows and a
+# query is one matrix-vector product over that block.
+
+METRICS = ['cosine', 'euclidean']
+
+
+def build_team_vectors(teams_data, attributes):
+    snapshots = teams_data.sort_values(['date', 'team_api_id'], kind='stable', ignore_index=True)
+    values = snapshots[attributes].to_numpy(dtype=np.float64)
+    std = values.std(axis=0)
+    vectors = ((values - values.mean(axis=0)) / np.where(std > 0, std, 1)).astype(np.float32)
+    norms = np.linalg.norm(vectors, axis=1)
+    dates = snapshots['date'].to_numpy()
+    starts = np.flatnonzero(np.r_[True, dates[1:] != dates[:-1]]) if len(dates) else np.array([], dtype=int)
+    stops = np.append(starts[1:], len(dates))
+    return {
+        'attributes': list(attributes),
+        'teams': snapshots[['team_api_id', 'team_long_name', 'date']],
+        'vectors': np.ascontiguousarray(vectors),
+        # Unit rows for cosine similarity and squared norms for Euclidean distances
+        'unit_vectors': np.ascontiguousarray(vectors / np.where(norms > 0, norms, 1)[:, None]),
+        'squared_norms': (norms ** 2).astype(np.float32),
+        'offsets': {pd.Timestamp(dates[start]): (int(start), int(stop)) for start, stop in zip(starts, stops)},
+    }
+
+
+def snapshot_dates(index, team_api_id=None):
+    # Snapshot dates of the index, or those at which a team has a snapshot
+    if team_api_id is None:
+        return list(index['offsets'])
+    teams = index['teams']
+    return sorted(pd.Timestamp(date) for date in teams.loc[teams['team_api_id'] == team_api_id, 'date'])
+
+
+def _scores(index, rows, queries, metric):
+    # Similarity of each query row to every row of the block, higher is closer
+    start, stop = rows
+    if metric == 'cosine':
+        return queries @ index['unit_vectors'][start:stop].T
+    if metric == 'euclidean':
+        products = queries @ index['vectors'][start:stop].T
+        squared = index['squared_norms'][start:stop] - 2 * products
+        squared += (queries ** 2).sum(axis=1, keepdims=True)
+        return -np.sqrt(np.maximum(squared, 0))
+    raise ValueError(f'unknown metric {metric!r}, expected one of {METRICS}')
+
+
+def _score_column(metric, scores):
+    # Scores as reported: the cosine similarity, or the Euclidean distance
+    return ('similarity', scores) if metric == 'cosine' else ('distance', -scores)
+
+
+def _top_k(scores, k):
+    # Column indices of the k highest scores of every row, best first
+    k = min(k, scores.shape[1])
+    if not k:
+        return np.empty((len(scores), 0), dtype=int)
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+def nearest_teams(index, team_api_id, date, k=5, metric='cosine'):
+    # The k teams whose attributes at the snapshot date are closest to the team's, closest first
+    start, stop = index['offsets'][pd.Timestamp(date)]
+    team_ids = index['teams']['team_api_id'].to_numpy()[start:stop]
+    position = np.flatnonzero(team_ids == team_api_id)
+    if not len(position):
+        raise KeyError(f'team {team_api_id} has no snapshot on {date}')
+    row = start + position[0]
+    query = index['unit_vectors' if metric == 'cosine' else 'vectors'][row:row + 1]
+    scores = _scores(index, (start, stop), query, metric)
+    # The team itself is never one of its neighbours
+    scores[0, position[0]] = -np.inf
+    neighbours = _top_k(scores, min(k, stop - start - 1))[0]
+    result = index['teams'].iloc[start + neighbours].reset_index(drop=True)
+    name, values = _score_column(metric, scores[0, neighbours])
+    result[name] = values
+    return result
+
+
+def neighbour_table(index, k=5, metric='cosine'):
+    # The k nearest teams of every snapshot, computed block by block with one matrix product
+    frames = []
+    team_ids = index['teams']['team_api_id'].to_numpy()
+    for date, (start, stop) in index['offsets'].items():
+        queries = index['unit_vectors' if metric == 'cosine' else 'vectors'][start:stop]
+        scores = _scores(index, (start, stop), queries, metric)
+        np.fill_diagonal(scores, -np.inf)
+        neighbours = _top_k(scores, min(k, stop - start - 1))
+        count = neighbours.shape[1]
+        name, values = _score_column(metric, np.take_along_axis(scores, neighbours, axis=1).ravel())
+        frames.append(pd.DataFrame({
+            'date': date,
+            'team_api_id': np.repeat(team_ids[start:stop], count),
+            'rank': np.tile(np.arange(1, count + 1, dtype=np.int8), stop - start),
+            'neighbour_api_id': team_ids[start + neighbours.ravel()],
+            name: values,
+        }))
+    if not frames:
+        return pd.DataFrame(columns=['date', 'team_api_id', 'rank', 'neighbour_api_id',
+                                     'similarity' if metric == 'cosine' else 'distance'])
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,89 @@
+import argparse
+import json
+import os
+
+from data_loader import (MANIFEST_NAME, SNAPSHOT_DIR, file_sha256, file_signature, parse_csv, read_manifest,
+                         schema_fingerprint, snapshot_is_fresh, snapshot_path, table_path)
+from schemas import COLUMN_TABLES, TABLE_NAMES
+
+
+# Offline compile step: converts the raw CSVs into typed Arrow IPC files the app can
+# memory-map at startup instead of parsing text.
+#
+#     python snapshot.py [--data-dir DIR] [--force]
+#
+# Column tables (see schemas.COLUMN_TABLES) get a file of their own, so the columns only a
+# few stages use are not mapped with the table they come from.
+SNAPSHOT_TABLES = TABLE_NAMES + list(COLUMN_TABLES)
+
+
+def write_table(name, df, data_dir=None):
+    # Writes the snapshot of a table already parsed from its current CSV and returns its
+    # manifest entry
+    import pyarrow as pa
+
+    source = table_path(name, data_dir)
+    _, mtime_ns, size = file_signature(source)
+
+    # Uncompressed IPC so the file can be memory-mapped without decoding
+    filename = name + '.arrow'
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_path = snapshot_path(filename + '.tmp', data_dir)
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, snapshot_path(filename, data_dir))
+
+    return {'file': filename, 'source': os.path.basename(source), 'sha256': file_sha256(source),
+            'size': size, 'mtime_ns': mtime_ns, 'rows': len(df), 'schema': schema_fingerprint(name)}
+
+
+def compile_table(name, data_dir=None):
+    return write_table(name, parse_csv(name, data_dir), data_dir)
+
+
+def write_manifest(manifest, data_dir=None):
+    # The manifest is written last so readers never see an entry for a half-written file
+    manifest['format'] = 'arrow-ipc'
+    tmp_path = snapshot_path(MANIFEST_NAME + '.tmp', data_dir)
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, snapshot_path(MANIFEST_NAME, data_dir))
+
+
+def update_snapshot(frames, data_dir=None):
+    # Refreshes the snapshot of the given tables from frames that match their current CSVs
+    os.makedirs(os.path.join(data_dir or os.getcwd(), SNAPSHOT_DIR), exist_ok=True)
+    manifest = read_manifest(data_dir)
+    for name, df in frames.items():
+        manifest['tables'][name] = write_table(name, df, data_dir)
+    write_manifest(manifest, data_dir)
+
+
+def compile_snapshot(names=SNAPSHOT_TABLES, data_dir=None, force=False):
+    os.makedirs(os.path.join(data_dir or os.getcwd(), SNAPSHOT_DIR), exist_ok=True)
+    manifest = read_manifest(data_dir)
+    compiled = []
+    for name in names:
+        if not force and snapshot_is_fresh(name, data_dir, manifest):
+            continue
+        manifest['tables'][name] = compile_table(name, data_dir)
+        compiled.append(name)
+    write_manifest(manifest, data_dir)
+    return compiled
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compile the football CSVs into an Arrow snapshot.')
+    parser.add_argument('--data-dir', default=None, help='directory holding the CSVs (default: current directory)')
+    parser.add_argument('--force', action='store_true', help='recompile tables whose snapshot is still fresh')
+    parser.add_argument('tables', nargs='*', default=SNAPSHOT_TABLES, help='tables to compile (default: all)')
+    args = parser.parse_args(argv)
+
+    compiled = compile_snapshot(args.tables, args.data_dir, args.force)
+    for name in args.tables:
+        print(f"{name}: {'compiled' if name in compiled else 'up to date'}")
+
+
+if __name__ == '__main__':
+    main()
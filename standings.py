@@ -0,0 +1,95 @@
+import numpy as np
+
+
+# League tables at every matchday, computed with cumulative sums over a team-match array
+# sorted by league, season, team and stage rather than by replaying matches in a loop.
+
+STANDINGS_COLUMNS = ['played', 'wins', 'draws', 'losses', 'goals_for', 'goals_against', 'points']
+
+
+def _group_starts(*keys):
+    # Boolean mask of the rows where a new run of equal keys starts in sorted arrays
+    starts = np.zeros(len(keys[0]), dtype=bool)
+    if len(starts):
+        starts[0] = True
+        for key in keys:
+            starts[1:] |= key[1:] != key[:-1]
+    return starts
+
+
+def _grouped_cumsum(values, starts):
+    # Cumulative sum restarting at every group start
+    totals = np.cumsum(values, axis=0)
+    start_positions = np.flatnonzero(starts)
+    offsets = np.zeros_like(totals[start_positions])
+    offsets[1:] = totals[start_positions[1:] - 1]
+    sizes = np.diff(np.append(start_positions, len(values)))
+    return totals - np.repeat(offsets, sizes, axis=0)
+
+
+def build_standings(team_matches):
+    # One row per (league_id, season, stage, team_api_id) with cumulative played, wins, draws,
+    # losses, goals, goal difference, points and rank after that stage. Teams are carried
+    # over stages they did not play in, so every table lists the whole league.
+    per_stage = team_matches.assign(
+        played=np.int16(1),
+        wins=(team_matches['result'] == 'W').astype(np.int16),
+        draws=(team_matches['result'] == 'D').astype(np.int16),
+        losses=(team_matches['result'] == 'L').astype(np.int16),
+        goals_for=team_matches['goals_for'].astype(np.int16),
+        goals_against=team_matches['goals_against'].astype(np.int16),
+        points=team_matches['points'].astype(np.int16),
+    ).groupby(['league_id', 'season', 'team_api_id', 'stage'], observed=True)[STANDINGS_COLUMNS].sum()
+    per_stage = per_stage.reset_index()
+
+    # Dense grid of every team of a league season at every stage of that season
+    season_keys = ['league_id', 'season']
+    last_stage = per_stage.groupby(season_keys, observed=True)['stage'].transform('max').to_numpy()
+    teams = per_stage.assign(last_stage=last_stage).drop_duplicates(['league_id', 'season', 'team_api_id'])
+    sizes = teams['last_stage'].to_numpy(dtype=np.int64)
+    team_rows = np.repeat(np.arange(len(teams)), sizes)
+    stages = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes) + 1
+    grid = teams[['league_id', 'season', 'team_api_id']].iloc[team_rows].reset_index(drop=True)
+    grid['stage'] = stages.astype(per_stage['stage'].dtype)
+
+    # Already sorted by league, season, team and stage, so the totals are grouped cumsums
+    grid = grid.merge(per_stage, on=['league_id', 'season', 'team_api_id', 'stage'], how='left', sort=False)
+    values = grid[STANDINGS_COLUMNS].fillna(0).to_numpy(dtype=np.int16)
+    starts = _group_starts(grid['league_id'].to_numpy(), grid['season'].cat.codes.to_numpy(),
+                           grid['team_api_id'].to_numpy())
+    grid[STANDINGS_COLUMNS] = _grouped_cumsum(values, starts)
+    grid['goal_difference'] = grid['goals_for'] - grid['goals_against']
+
+    # Rank on points, then goal difference, then goals scored
+    order = np.lexsort((grid['team_api_id'].to_numpy(), -grid['goals_for'].to_numpy(),
+                        -grid['goal_difference'].to_numpy(), -grid['points'].to_numpy(),
+                        grid['stage'].to_numpy(), grid['season'].cat.codes.to_numpy(),
+                        grid['league_id'].to_numpy()))
+    standings = grid.take(order).reset_index(drop=True)
+    starts = _group_starts(standings['league_id'].to_numpy(), standings['season'].cat.codes.to_numpy(),
+                           standings['stage'].to_numpy())
+    standings['rank'] = _grouped_cumsum(np.ones(len(standings), dtype=np.int16), starts)
+    return standings
+
+
+def index_standings(standings):
+    # Offsets of the table after each stage in the standings rows, by (league_id, season)
+    starts = np.flatnonzero(_group_starts(standings['league_id'].to_numpy(),
+                                          standings['season'].cat.codes.to_numpy(),
+                                          standings['stage'].to_numpy()))
+    stops = np.append(starts[1:], len(standings))
+    keys = standings.iloc[starts][['league_id', 'season', 'stage']].itertuples(index=False)
+    index = {}
+    for (league_id, season, stage), start, stop in zip(keys, starts, stops):
+        index.setdefault((int(league_id), str(season)), {})[int(stage)] = (int(start), int(stop))
+    return index
+
+
+def table_at_stage(standings, index, league_id, season, stage):
+    # League table after the given stage; a stage past the end of the season returns the
+    # final table and an unknown league season an empty one
+    tables = index.get((league_id, season))
+    if not tables:
+        return standings.iloc[0:0]
+    start, stop = tables[min(max(stage, min(tables)), max(tables))]
+    return standings.iloc[start:stop]
@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+
+
+# Summary statistics kept as mergeable state instead of being recomputed from the rows:
+#   pairs, sums, squares, products: c x c matrices over the rows where both columns of a
+#       pair are present (count, sum of the row column, its sum of squares, sum of the
+#       products), enough for describe()'s count/mean/std and for pairwise correlations
+#   minimum, maximum: per column
+#   sketches: per column value counts for the quantiles, exact while a column has at most
+#       SKETCH_SIZE distinct values and snapped to a power-of-two grid beyond that
+# States of disjoint sets of rows merge by addition, so a table is summarized per partition
+# (e.g. league and season) once, and any selection of partitions is served from the merged
+# states of its partitions without touching the rows.
+
+SKETCH_SIZE = 1 << 15
+PERCENTILES = [0.25, 0.5, 0.75]
+
+
+def _sketch(values, counts, width=0.0):
+    # Value counts, compacted onto a grid of the given width (0 keeps the values exact)
+    if width:
+        values = np.round(values / width) * width
+    values, inverse = np.unique(values, return_inverse=True)
+    counts = np.bincount(inverse, weights=counts, minlength=len(values)).astype(np.int64)
+    if len(values) > SKETCH_SIZE:
+        width = 2.0 ** np.ceil(np.log2((values[-1] - values[0]) / SKETCH_SIZE))
+        return _sketch(values, counts, width)
+    return {'values': values, 'counts': counts, 'width': width}
+
+
+def _merge_sketches(sketches):
+    width = max(sketch['width'] for sketch in sketches)
+    return _sketch(np.concatenate([sketch['values'] for sketch in sketches]),
+                   np.concatenate([sketch['counts'] for sketch in sketches]), width)
+
+
+def sketch_quantiles(sketch, quantiles):
+    # Quantiles interpolated linearly between the closest ranks, as pandas does
+    counts = np.cumsum(sketch['counts'])
+    if not len(counts) or not counts[-1]:
+        return np.full(len(quantiles), np.nan)
+    positions = (counts[-1] - 1) * np.asarray(quantiles, dtype=np.float64)
+    below = np.floor(positions)
+    lower = sketch['values'][np.searchsorted(counts, below, side='right')]
+    upper = sketch['values'][np.searchsorted(counts, np.minimum(below + 1, counts[-1] - 1), side='right')]
+    return lower + (positions - below) * (upper - lower)
+
+
+def describe_columns(frame):
+    # The columns DataFrame.describe() covers by default: numbers and dates, not booleans
+    return [column for column in frame.columns
+            if frame[column].dtype.kind in 'iufM' and frame[column].dtype != bool]
+
+
+def _values(frame, columns):
+    # Columns as float64, dates as nanoseconds since the epoch
+    values = np.empty((len(frame), len(columns)), dtype=np.float64)
+    for position, column in enumerate(columns):
+        series = frame[column]
+        if series.dtype.kind == 'M':
+            values[:, position] = series.to_numpy().view(np.int64)
+            values[series.isna().to_numpy(), position] = np.nan
+        else:
+            values[:, position] = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    return values
+
+
+def _statistics(values, columns, dates):
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+    weights = present.astype(np.float64)
+    sketches = []
+    for position in range(len(columns)):
+        column = values[present[:, position], position]
+        sketches.append(_sketch(column, np.ones(len(column))))
+    any_present = present.any(axis=0)
+    minimum = np.where(any_present, np.min(filled, axis=0, initial=np.inf, where=present), np.nan)
+    maximum = np.where(any_present, np.max(filled, axis=0, initial=-np.inf, where=present), np.nan)
+    return {
+        'columns': list(columns),
+        'dates': list(dates),
+        'pairs': (weights.T @ weights).astype(np.int64),
+        'sums': filled.T @ weights,
+        'squares': (filled ** 2).T @ weights,
+        'products': filled.T @ filled,
+        'minimum': minimum,
+        'maximum': maximum,
+        'sketches': sketches,
+    }
+
+
+def column_statistics(frame, columns):
+    # Statistics state of the given columns of a frame
+    dates = [column for column in columns if frame[column].dtype.kind == 'M']
+    return _statistics(_values(frame, columns), columns, dates)
+
+
+def partition_statistics(frame, columns, keys):
+    # Statistics state of every partition of the frame, keyed by the tuple of the values of
+    # the key arrays
+    values = _values(frame, columns)
+    dates = [column for column in columns if frame[column].dtype.kind == 'M']
+    groups = pd.Series(np.arange(len(frame))).groupby([np.asarray(key) for key in keys], sort=True).indices
+    # Keys are always tuples, even for a single key array
+    return {key if isinstance(key, tuple) else (key,): _statistics(values[rows], columns, dates)
+            for key, rows in groups.items()}
+
+
+def merge_statistics(states):
+    # Statistics state of the union of the rows behind each of the states
+    states = list(states)
+    if not states:
+        return None
+    merged = dict(states[0])
+    for name in ['pairs', 'sums', 'squares', 'products']:
+        merged[name] = sum(state[name] for state in states)
+    merged['minimum'] = np.fmin.reduce([state['minimum'] for state in states])
+    merged['maximum'] = np.fmax.reduce([state['maximum'] for state in states])
+    merged['sketches'] = [_merge_sketches(sketches) for sketches in zip(*(state['sketches'] for state in states))]
+    return merged
+
+
+def select_statistics(partitions, keep=None):
+    # Merged state of the partitions whose key passes the keep filter (all of them by default)
+    return merge_statistics(state for key, state in partitions.items() if keep is None or keep(key))
+
+
+def _timestamp(nanoseconds):
+    return pd.NaT if np.isnan(nanoseconds) else pd.Timestamp(int(round(nanoseconds)))
+
+
+def describe(state, percentiles=PERCENTILES):
+    # The table DataFrame.describe() gives for the rows behind the state
+    labels = [f'{percentile:.0%}' for percentile in percentiles]
+    count = np.diag(state['pairs']).astype(np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.diag(state['sums']) / count
+        variance = (np.diag(state['squares']) - count * mean ** 2) / (count - 1)
+    std = np.sqrt(np.maximum(variance, 0))
+    descriptions = []
+    for position, column in enumerate(state['columns']):
+        quantiles = sketch_quantiles(state['sketches'][position], percentiles)
+        if column in state['dates']:
+            values = ([int(count[position]), _timestamp(mean[position]), _timestamp(state['minimum'][position])] +
+                      [_timestamp(value) for value in quantiles] + [_timestamp(state['maximum'][position])])
+            descriptions.append(pd.Series(values, index=['count', 'mean', 'min'] + labels + ['max'], name=column))
+        else:
+            values = ([count[position], mean[position], std[position], state['minimum'][position]] +
+                      list(quantiles) + [state['maximum'][position]])
+            descriptions.append(pd.Series(values, index=['count', 'mean', 'std', 'min'] + labels + ['max'],
+                                          name=column))
+    # Rows in the order pandas uses, the shortest description first
+    rows = []
+    for description in sorted(descriptions, key=len):
+        rows.extend(name for name in description.index if name not in rows)
+    return pd.concat(descriptions, axis=1).reindex(rows)
+
+
+def correlation(state):
+    # Pearson correlations over pairwise complete rows, as DataFrame.corr() computes them
+    n = state['pairs'].astype(np.float64)
+    sums = state['sums']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        covariance = n * state['products'] - sums * sums.T
+        spread = n * state['squares'] - sums ** 2
+        values = covariance / np.sqrt(spread * spread.T)
+    values = np.clip(values, -1, 1)
+    np.fill_diagonal(values, np.where(np.diag(n) > 1, 1.0, np.nan))
+    return pd.DataFrame(values, index=state['columns'], columns=state['columns'])
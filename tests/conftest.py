@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_loader
+import events
+import pipeline
+import render_cache
+from schemas import (BOOKMAKERS, LINEUP_COLUMNS, MATCH_COLUMNS, MATCH_EVENT_COLUMNS, PLAYER_RATINGS,
+                     TEAM_CLASS_ATTRIBUTES, TEAM_NUMERIC_ATTRIBUTES)
+
+
+# A few seasons of a small three-league dataset written as CSVs with the columns of the real
+# ones, so the loaders, stages and CLIs run on it unchanged
+
+LEAGUES = [1, 1729, 4769]
+TEAMS = list(range(9000, 9012))
+PLAYERS = list(range(30000, 30060))
+SEASONS = [2012, 2013, 2014]
+MATCHES_PER_SEASON = 40
+
+_CLASSES = ['Low', 'Medium', 'High']
+
+
+def goal_xml(team_api_id, goals):
+    values = ''.join(f'<value><elapsed>{10 * (goal + 1)}</elapsed><subtype>shot</subtype>'
+                     f'<player1>{PLAYERS[goal]}</player1><team>{team_api_id}</team></value>'
+                     for goal in range(goals))
+    return f'<goal>{values}</goal>'
+
+
+def match_rows(rng, match_api_ids, season, teams=TEAMS):
+    # Match.csv rows, line-ups, odds and event XML included, for the given ids and season
+    n = len(match_api_ids)
+    home = rng.choice(teams, n)
+    away = np.array([rng.choice([team for team in teams if team != h]) for h in home])
+    league = rng.choice(LEAGUES, n)
+    stage = rng.integers(1, 30, n)
+    rows = pd.DataFrame({
+        'id': np.asarray(match_api_ids) - 400000, 'country_id': league, 'league_id': league,
+        'season': f'{season}/{season + 1}', 'stage': stage,
+        'date': [(pd.Timestamp(f'{season}-08-01') + pd.Timedelta(days=7 * int(s))).strftime('%Y-%m-%d %H:%M:%S')
+                 for s in stage],
+        'match_api_id': match_api_ids, 'home_team_api_id': home, 'away_team_api_id': away,
+        'home_team_goal': rng.integers(0, 4, n), 'away_team_goal': rng.integers(0, 4, n),
+    })
+    for column in LINEUP_COLUMNS:
+        rows[column] = rng.choice(PLAYERS, n).astype(float)
+    for bookmaker in BOOKMAKERS:
+        for outcome, (low, high) in zip('HDA', [(1.2, 5), (3, 4), (1.5, 8)]):
+            rows[bookmaker + outcome] = rng.uniform(low, high, n).round(2)
+    rows['goal'] = [goal_xml(team, goals) for team, goals in zip(home, rows['home_team_goal'])]
+    rows['corner'] = [f'<corner><value><elapsed>5</elapsed><team>{team}</team></value></corner>' for team in away]
+    rows['possession'] = ('<possession><value><elapsed>45</elapsed><homepos>55</homepos>'
+                          '<awaypos>45</awaypos></value></possession>')
+    for column in MATCH_EVENT_COLUMNS:
+        if column not in rows:
+            rows[column] = f'<{column} />'
+    return rows
+
+
+def team_attribute_rows(rng, teams, year, first_id):
+    rows = pd.DataFrame({'id': range(first_id, first_id + len(teams)), 'team_fifa_api_id': np.asarray(teams) + 1000,
+                         'team_api_id': teams, 'date': f'{year}-02-22 00:00:00'})
+    for column in TEAM_NUMERIC_ATTRIBUTES + ['buildUpPlayDribbling']:
+        rows[column] = rng.integers(20, 80, len(teams))
+    for column in TEAM_CLASS_ATTRIBUTES:
+        rows[column] = rng.choice(_CLASSES, len(teams))
+    return rows
+
+
+def write_dataset(data_dir, seed=0):
+    rng = np.random.default_rng(seed)
+    pd.DataFrame({'id': LEAGUES, 'name': ['Belgium', 'England', 'France']}).to_csv(data_dir / 'Country.csv',
+                                                                                  index=False)
+    pd.DataFrame({'id': LEAGUES, 'country_id': LEAGUES,
+                  'name': ['Belgium Jupiler League', 'England Premier League', 'France Ligue 1']}).to_csv(
+        data_dir / 'League.csv', index=False)
+    pd.DataFrame({'id': range(1, len(TEAMS) + 1), 'team_api_id': TEAMS, 'team_fifa_api_id': np.array(TEAMS) + 1000,
+                  'team_long_name': [f'Team {team}' for team in TEAMS],
+                  'team_short_name': [f'T{team % 100:02d}' for team in TEAMS]}).to_csv(data_dir / 'Team.csv',
+                                                                                     index=False)
+    attributes = [team_attribute_rows(rng, TEAMS, year, 1 + i * len(TEAMS)) for i, year in enumerate(SEASONS)]
+    pd.concat(attributes).to_csv(data_dir / 'Team_Attributes.csv', index=False)
+
+    players = pd.DataFrame({'id': range(1, len(PLAYERS) + 1), 'player_api_id': PLAYERS,
+                            'player_name': [f'P {player}' for player in PLAYERS],
+                            'player_fifa_api_id': np.array(PLAYERS) + 5, 'birthday': '1990-01-01 00:00:00',
+                            'height': 180.0, 'weight': 170})
+    players.to_csv(data_dir / 'Player.csv', index=False)
+    dates = [f'{year}-01-01 00:00:00' for year in range(2011, 2016)]
+    ratings = pd.DataFrame({'player_fifa_api_id': np.repeat(np.array(PLAYERS) + 5, len(dates)),
+                            'player_api_id': np.repeat(PLAYERS, len(dates)), 'date': dates * len(PLAYERS)})
+    ratings.insert(0, 'id', range(1, len(ratings) + 1))
+    for column in PLAYER_RATINGS:
+        ratings[column] = rng.integers(40, 90, len(ratings)).astype(float)
+    ratings['preferred_foot'] = 'right'
+    ratings['attacking_work_rate'] = 'medium'
+    ratings['defensive_work_rate'] = 'medium'
+    ratings.to_csv(data_dir / 'Player_Attributes.csv', index=False)
+
+    matches = [match_rows(rng, range(400000 + i * MATCHES_PER_SEASON, 400000 + (i + 1) * MATCHES_PER_SEASON), season)
+               for i, season in enumerate(SEASONS)]
+    pd.concat(matches).to_csv(data_dir / 'Match.csv', index=False)
+    assert set(MATCH_COLUMNS) <= set(matches[0].columns)
+    return data_dir
+
+
+def clear_caches():
+    data_loader.clear_cache()
+    pipeline.clear_cache()
+    render_cache.clear_cache()
+    events._events_cache.clear()
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    clear_caches()
+    yield str(write_dataset(tmp_path))
+    clear_caches()
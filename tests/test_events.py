@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+import events
+import incremental
+from conftest import clear_caches, goal_xml, match_rows
+
+
+def test_resent_match_keeps_only_its_last_events(data_dir, tmp_path):
+    before = events.load_events(data_dir, workers=1)
+    match_api_id = 400005
+    old_goals = ((before['events']['match_api_id'] == match_api_id) & (before['events']['event'] == 'goal')).sum()
+
+    # Re-send the match with one more home goal than it had
+    delta = match_rows(np.random.default_rng(1), [match_api_id], 2012)
+    delta['home_team_goal'] = old_goals + 1
+    delta['goal'] = goal_xml(int(delta['home_team_api_id'].iloc[0]), old_goals + 1)
+    delta_path = tmp_path / 'delta.csv'
+    delta.to_csv(delta_path, index=False)
+    incremental.ingest(matches_path=str(delta_path), data_dir=data_dir)
+    clear_caches()
+
+    after = events.load_events(data_dir, workers=1)
+    match_events = after['events'][after['events']['match_api_id'] == match_api_id]
+    assert (match_events['event'] == 'goal').sum() == old_goals + 1
+    assert (match_events['event'] == 'corner').sum() == 1
+    assert (after['possession']['match_api_id'] == match_api_id).sum() == 1
+
+    # The events of every other match are unchanged
+    others_before = before['events'][before['events']['match_api_id'] != match_api_id]
+    others_after = after['events'][after['events']['match_api_id'] != match_api_id]
+    pd.testing.assert_frame_equal(others_after.reset_index(drop=True), others_before.reset_index(drop=True),
+                                  check_categorical=False)
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pandas.api.types as ptypes
+
+from features import add_match_outcomes
+
+
+# The row-by-row helpers add_match_outcomes replaced, as they were in EuropeanTeamsApp.py
+def match_status(initial=0):
+    if initial > 0:
+        return 'W'
+    elif initial == 0:
+        return 'D'
+    else:
+        return 'L'
+
+
+def match_status2(initial2='w'):
+    if initial2 == 'W':
+        return 3
+    elif initial2 == 'D':
+        return 1
+    else:
+        return 0
+
+
+def check_wins(wins='W'):
+    if wins == 'W':
+        return 1
+    else:
+        return 0
+
+
+def _goal_grid():
+    # Every score up to 5-5: home wins, draws and away wins by every margin
+    goals = np.arange(6)
+    home, away = np.meshgrid(goals, goals, indexing='ij')
+    return pd.DataFrame({'home_team_goal': home.ravel(), 'away_team_goal': away.ravel()})
+
+
+def _old_outcomes(matches_data):
+    matches_data = matches_data.copy()
+    matches_data['HomeTeamGD'] = matches_data['home_team_goal'] - matches_data['away_team_goal']
+    matches_data['AwayTeamGD'] = matches_data['away_team_goal'] - matches_data['home_team_goal']
+    matches_data['Draw'] = matches_data['home_team_goal'] == matches_data['away_team_goal']
+    matches_data['HomeResults'] = matches_data['HomeTeamGD'].apply(match_status)
+    matches_data['AwayResults'] = matches_data['AwayTeamGD'].apply(match_status)
+    matches_data['HTPoints'] = matches_data['HomeResults'].apply(match_status2)
+    matches_data['ATPoints'] = matches_data['AwayResults'].apply(match_status2)
+    matches_data['HomeWin'] = matches_data['HomeResults'].apply(check_wins)
+    matches_data['AwayWin'] = matches_data['AwayResults'].apply(check_wins)
+    return matches_data
+
+
+def test_add_match_outcomes_matches_old_helpers():
+    matches_data = _goal_grid()
+    new = add_match_outcomes(matches_data)
+    old = _old_outcomes(matches_data)
+    assert set(new['HomeResults']) == {'W', 'D', 'L'}
+    for column in ['HomeTeamGD', 'AwayTeamGD', 'Draw', 'HomeResults', 'AwayResults', 'HTPoints', 'ATPoints',
+                   'HomeWin', 'AwayWin']:
+        assert new[column].astype(object).tolist() == old[column].tolist(), column
+
+
+def test_add_match_outcomes_dtypes():
+    new = add_match_outcomes(_goal_grid())
+    for column in ['HomeResults', 'AwayResults']:
+        assert isinstance(new[column].dtype, pd.CategoricalDtype)
+        assert list(new[column].cat.categories) == ['D', 'L', 'W']
+    for column in ['HTPoints', 'ATPoints', 'HomeWin', 'AwayWin']:
+        assert new[column].dtype == np.int8, column
+    assert ptypes.is_bool_dtype(new['Draw'])
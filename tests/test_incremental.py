@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import incremental
+import pipeline
+from conftest import TEAMS, clear_caches, match_rows, team_attribute_rows
+
+
+# Frames the incremental path may leave in another row order than a rebuild, with the
+# columns identifying a row
+ROW_KEYS = {'teams_data': ['team_api_id', 'date'], 'team_matches': ['match_api_id', 'home']}
+
+
+def assert_same(updated, rebuilt, path):
+    if isinstance(updated, dict):
+        assert list(updated) == list(rebuilt), path
+        for key in updated:
+            assert_same(updated[key], rebuilt[key], f'{path}/{key}')
+    elif isinstance(updated, (list, tuple)):
+        assert len(updated) == len(rebuilt), path
+        for position, (left, right) in enumerate(zip(updated, rebuilt)):
+            assert_same(left, right, f'{path}/{position}')
+    elif isinstance(updated, pd.DataFrame):
+        pd.testing.assert_frame_equal(updated, rebuilt, obj=path)
+    elif isinstance(updated, pd.Series):
+        pd.testing.assert_series_equal(updated, rebuilt, obj=path)
+    elif isinstance(updated, np.ndarray) and updated.dtype.kind == 'f':
+        np.testing.assert_allclose(updated, rebuilt, rtol=1e-9, err_msg=path)
+    elif isinstance(updated, np.ndarray):
+        np.testing.assert_array_equal(updated, rebuilt, err_msg=path)
+    elif isinstance(updated, float):
+        assert updated == pytest.approx(rebuilt, nan_ok=True), path
+    else:
+        assert updated == rebuilt, path
+
+
+def _normalized(name, value):
+    if name in ROW_KEYS:
+        return value.sort_values(ROW_KEYS[name], kind='stable').reset_index(drop=True)
+    return value
+
+
+def _write_delta(data_dir, changed_matches):
+    rng = np.random.default_rng(5)
+    matches = [match_rows(rng, range(400500, 400520), 2015)]
+    if changed_matches:
+        # Re-sent matches of two earlier seasons, and new snapshots the new season is paired with
+        matches.insert(0, match_rows(rng, [400003, 400050], 2012))
+        team_attribute_rows(rng, TEAMS[:4], 2015, 1000).to_csv(f'{data_dir}/delta_snapshots.csv', index=False)
+    pd.concat(matches).to_csv(f'{data_dir}/delta_matches.csv', index=False)
+
+
+@pytest.mark.parametrize('changed_matches', [True, False], ids=['changed-matches', 'later-matches'])
+def test_ingest_matches_full_rebuild(data_dir, changed_matches):
+    for name in incremental.UPDATED_STAGES:
+        pipeline.get(name, data_dir)
+    _write_delta(data_dir, changed_matches)
+
+    incremental.ingest(f'{data_dir}/delta_matches.csv',
+                       f'{data_dir}/delta_snapshots.csv' if changed_matches else None, data_dir)
+    updated = {name: pipeline.get(name, data_dir) for name in incremental.UPDATED_STAGES}
+    clear_caches()
+    rebuilt = {name: pipeline.get(name, data_dir) for name in incremental.UPDATED_STAGES}
+
+    for name in incremental.UPDATED_STAGES:
+        assert_same(_normalized(name, updated[name]), _normalized(name, rebuilt[name]), name)
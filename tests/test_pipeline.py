@@ -0,0 +1,22 @@
+import pickle
+
+import pipeline
+from conftest import clear_caches
+from data_loader import data_version
+
+
+def test_unloadable_saved_stage_is_rebuilt(data_dir):
+    expected = pipeline.get('teams_data', data_dir)
+    pipeline.save(['teams_data'], data_dir)
+    # A valid header followed by a payload referencing a class removed from pandas 2
+    with open(pipeline._saved_path('teams_data', data_dir), 'wb') as f:
+        pickle.dump(pipeline._saved_header(data_version(data_dir)), f)
+        f.write(b'cpandas.core.indexes.numeric\nInt64Index\n.')
+    clear_caches()
+    assert pipeline.get('teams_data', data_dir).equals(expected)
+
+
+def test_saved_stage_is_read_back(data_dir):
+    expected = pipeline.get('team_means', data_dir)
+    pipeline.save(['team_means'], data_dir)
+    assert pipeline._read_saved('team_means', data_dir, data_version(data_dir)).equals(expected)
@@ -0,0 +1,118 @@
+import charts
+import pipeline
+import render_cache
+from data_loader import data_version, schema_version
+from features import normalized_crosstab, result_counts, team_attribute_means, top_teams
+from partitions import select, selection_filter, selection_key
+from schemas import TEAM_CLASS_ATTRIBUTES, TEAM_NUMERIC_ATTRIBUTES
+from summaries import correlation, select_statistics
+
+
+# Charts of the app by kind, with the variables each one can be drawn for. Keys of the
+# render cache are (kind, variable, data version, theme), plus the table schemas and the
+# chart format so images drawn by older code are not served, and the app and the precompute
+# command share images as long as they both go through chart_image().
+#
+# Every view also takes an optional league/season selection (see partitions.py). Filtered
+# views work on the rows of the selected partitions only and are cached under a key that
+# ends with the selection.
+CHART_VARIABLES = {
+    'histogram': TEAM_NUMERIC_ATTRIBUTES,
+    'category_bar_chart': TEAM_CLASS_ATTRIBUTES,
+    'correlation_heatmap': [None],
+    'top_teams_bar_chart': TEAM_NUMERIC_ATTRIBUTES,
+    'home_results_heatmap': TEAM_CLASS_ATTRIBUTES,
+    'away_results_heatmap': TEAM_CLASS_ATTRIBUTES,
+}
+
+# Stages the charts are drawn from, and the ones filtered charts select partitions from
+CHART_STAGES = ['teams_data', 'team_means', 'team_correlations', 'home_result_counts', 'away_result_counts']
+SELECTION_STAGES = ['team_partitions', 'team_statistics', 'home_partitions', 'away_partitions']
+
+
+def _selected(name, partitions_name, selection, data_dir):
+    # Rows of a stage for a selection, the stage itself when nothing is filtered
+    if selection_filter(selection) is None:
+        return pipeline.get(name, data_dir)
+    return select(pipeline.get(partitions_name, data_dir), selection)
+
+
+def selected_teams(selection=None, data_dir=None):
+    return _selected('teams_data', 'team_partitions', selection, data_dir)
+
+
+def selected_matches(selection=None, data_dir=None):
+    return _selected('matches_data', 'match_partitions', selection, data_dir)
+
+
+def team_statistics(selection=None, data_dir=None):
+    # Summary statistics state of the selected team snapshots, None when there are none
+    return select_statistics(pipeline.get('team_statistics', data_dir), selection_filter(selection))
+
+
+def match_statistics(selection=None, data_dir=None):
+    # Summary statistics state of the selected matches, None when there are none
+    return select_statistics(pipeline.get('match_statistics', data_dir), selection_filter(selection))
+
+
+def top_teams_table(attribute, n=10, data_dir=None, selection=None):
+    if selection_filter(selection) is None:
+        means = pipeline.get('team_means', data_dir)
+    else:
+        means = team_attribute_means(selected_teams(selection, data_dir), TEAM_NUMERIC_ATTRIBUTES)
+    return top_teams(means, attribute, n=n)
+
+
+def _result_counts(side, variable, selection, data_dir):
+    if selection_filter(selection) is None:
+        return pipeline.get(side + '_result_counts', data_dir)[variable]
+    joined = select(pipeline.get(side + '_partitions', data_dir), selection)
+    if joined.empty:
+        return None
+    return result_counts(joined, [variable], 'HomeResults' if side == 'home' else 'AwayResults')[variable]
+
+
+def results_table(side, variable, data_dir=None, selection=None):
+    # Share of each result per class of a team attribute, the table behind a results heatmap
+    counts = _result_counts(side, variable, selection, data_dir)
+    return None if counts is None else normalized_crosstab(counts)
+
+
+def draw_chart(kind, variable, data_dir=None, selection=None):
+    # Builds the figure of a chart from the pipeline stages it depends on
+    if kind in ('histogram', 'category_bar_chart'):
+        teams_data = selected_teams(selection, data_dir)
+        if teams_data.empty:
+            return charts.no_data(variable)
+        return getattr(charts, kind)(teams_data, variable)
+    if kind == 'correlation_heatmap':
+        if selection_filter(selection) is None:
+            return charts.correlation_heatmap(pipeline.get('team_correlations', data_dir))
+        state = team_statistics(selection, data_dir)
+        if state is None:
+            return charts.no_data("Correlation Heatmap")
+        return charts.correlation_heatmap(correlation(state))
+    if kind == 'top_teams_bar_chart':
+        table = top_teams_table(variable, data_dir=data_dir, selection=selection)
+        if table.empty:
+            return charts.no_data(variable)
+        return charts.top_teams_bar_chart(table, variable)
+    if kind == 'home_results_heatmap':
+        table = results_table('home', variable, data_dir, selection)
+        if table is None:
+            return charts.no_data(variable)
+        return charts.results_heatmap(table, variable, 'HomeResults')
+    if kind == 'away_results_heatmap':
+        table = results_table('away', variable, data_dir, selection)
+        if table is None:
+            return charts.no_data(variable)
+        return charts.results_heatmap(table, variable, 'Away Results', fmt='.2g')
+    raise ValueError(f'unknown chart kind: {kind}')
+
+
+def chart_image(kind, variable=None, data_dir=None, theme=None, format='png', selection=None):
+    # Encoded image of a chart, drawn only when neither memory nor disk has it
+    key = (kind, variable, data_version(data_dir), theme, schema_version(), charts.CHARTS_FORMAT)
+    if selection_key(selection) is not None:
+        key += (selection_key(selection),)
+    return render_cache.render(key, lambda: draw_chart(kind, variable, data_dir, selection), format)